@@ -1,8 +1,65 @@
-from flask import Flask, render_template, jsonify
-import subprocess
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules"))
+import requests
+from compliance_llm import stream_llm_prompt
+from corpus_snapshots import CorpusSnapshots
+from worker_pool import WorkerPool, WorkerError
 
 app = Flask(__name__)
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_compliance = {}
+_compliance_lock = threading.Lock()
+_workers = {}
+_workers_lock = threading.Lock()
+
+def load_config():
+    with open(os.path.join(BASE_DIR, "config.json"), "r") as f:
+        return json.load(f)
+
+def get_compliance_data():
+    """Return config.json and the current compliance corpus snapshot, loading them on first use.
+
+    The corpus is rebuilt and swapped in the background when data/last_processed.json shows
+    a completed refresh (see CorpusSnapshots.watch).
+    """
+    with _compliance_lock:
+        if not _compliance:
+            config = load_config()
+            snapshots = CorpusSnapshots(config)
+            if config.get("snapshot_poll_seconds", 60):
+                snapshots.watch(config.get("snapshot_poll_seconds", 60))
+            _compliance["config"] = config
+            _compliance["snapshots"] = snapshots
+        return _compliance["config"], _compliance["snapshots"].current
+
+def get_worker_pool():
+    """Start the pool of warm Python workers that run scripts for requests, once, on first use."""
+    with _workers_lock:
+        if not _workers:
+            try:
+                config = load_config()
+            except (OSError, ValueError):
+                config = {}
+            _workers["pool"] = WorkerPool(
+                size=config.get("worker_pool_size", 2),
+                max_calls=config.get("worker_max_calls", 50),
+                timeout=config.get("worker_timeout_seconds", 600),
+                preload=("requests",)
+            )
+        return _workers["pool"]
+
+def sse_event(data, event=None):
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -10,10 +67,40 @@ def index():
 @app.route("/run-python", methods=["GET"])
 def run_python():
     try:
-        result = subprocess.run(["python3", "script.py"], capture_output=True, text=True, check=True)
-        return jsonify({"output": result.stdout})
-    except subprocess.CalledProcessError as e:
-        return jsonify({"error": e.stderr}), 500
+        result = get_worker_pool().run(os.path.join(BASE_DIR, "script.py"), cwd=os.getcwd())
+    except WorkerError as e:
+        return jsonify({"error": str(e)}), 500
+    if result["exit_code"] != 0:
+        return jsonify({"error": result["stderr"]}), 500
+    return jsonify({"output": result["stdout"]})
+
+@app.route("/llm/stream", methods=["GET"])
+def llm_stream():
+    """Stream the answer to ?prompt=... as server-sent events.
+
+    Each 'message' event carries {"text": ...}; a final 'done' event carries the timings
+    (ttft, total, source), or an 'error' event carries {"error": ...}.
+    """
+    prompt = request.args.get("prompt", "").strip()
+    if not prompt:
+        return jsonify({"error": "Missing 'prompt' query parameter"}), 400
+    config, corpus = get_compliance_data()
+
+    def events():
+        timings = {}
+        try:
+            for text in stream_llm_prompt(config, corpus, prompt, timings):
+                yield sse_event({"text": text})
+        except requests.RequestException as e:
+            yield sse_event({"error": f"Error contacting OpenRouter: {e}"}, "error")
+            return
+        yield sse_event(timings, "done")
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=3000)
\ No newline at end of file
+    app.run(debug=True, host="0.0.0.0", port=3000)
@@ -0,0 +1,89 @@
+# acronym_expander.py
+import logging
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+class AcronymExpander:
+    """Precompiled Aho-Corasick automaton that expands every acronym in a prompt in one pass.
+
+    Matches are case-sensitive and must sit on word boundaries, so 'CA' is expanded in
+    'CA certificates' but not inside 'CAC' or 'local'. Overlapping candidates resolve to
+    the leftmost, then longest, acronym.
+    """
+
+    def __init__(self, acronym_map):
+        self.acronym_map = acronym_map
+        self._by_upper = {acronym.upper(): meaning for acronym, meaning in acronym_map.items()}
+        # Trie nodes: goto transitions, failure link and the acronyms ending at each node
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for acronym in acronym_map:
+            if acronym:
+                self._add(acronym)
+        self._link()
+
+    def _add(self, acronym):
+        node = 0
+        for char in acronym:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][char] = next_node
+            node = next_node
+        self._output[node].append(acronym)
+
+    def _link(self):
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = list(self._goto[0].values())  # Depth-1 nodes keep their failure link to the root
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text):
+        """Return non-overlapping (start, end, acronym) whole-word matches in text, left to right."""
+        candidates = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for acronym in self._output[node]:
+                start = position - len(acronym) + 1
+                end = position + 1
+                if (start == 0 or not _is_word_char(text[start - 1])) and (end == len(text) or not _is_word_char(text[end])):
+                    candidates.append((start, end, acronym))
+        candidates.sort(key=lambda match: (match[0], -match[1]))
+        matches = []
+        last_end = 0
+        for start, end, acronym in candidates:
+            if start >= last_end:
+                matches.append((start, end, acronym))
+                last_end = end
+        return matches
+
+    def expand(self, text):
+        """Return text with each acronym followed by its meaning, e.g. 'AAA (Authentication, ...)'."""
+        pieces = []
+        last_end = 0
+        for start, end, acronym in self.find(text):
+            meaning = self.acronym_map[acronym]
+            pieces.append(text[last_end:end])
+            pieces.append(f" ({meaning})")
+            last_end = end
+            logging.info(f"Expanded '{acronym}' to '{acronym} ({meaning})' in prompt")
+        pieces.append(text[last_end:])
+        return "".join(pieces)
+
+    def resolve(self, term):
+        """Return the meaning of term if the whole term is an acronym (case-insensitive), else None."""
+        return self._by_upper.get(term.strip().upper())
@@ -0,0 +1,46 @@
+# attack_mapping.py
+import os
+import json
+import logging
+
+MAPPING_FILES = {
+    "nist_800_53_rev5": "nist_800_53-rev5_attack-14.1-enterprise_json.json",
+    "nist_800_53_rev4": "nist_800_53-rev4_attack-14.1-enterprise_json.json",
+    "cis": "cis_json.json"
+}
+
+def attack_mapping_file(config, base_path):
+    """Return (framework, path) of the ATT&CK mapping file for the configured framework."""
+    framework = config.get("framework", "nist_800_53_rev5")
+    mapping_filename = MAPPING_FILES.get(framework, MAPPING_FILES["nist_800_53_rev5"])
+    return framework, os.path.join(base_path, "data", mapping_filename)
+
+def load_attack_mapping(framework, mapping_file):
+    """Return {control_id: [technique dicts]} from an ATT&CK mapping file, or {} if it is missing or invalid.
+
+    Each technique dict carries at least "id" and "name", in the order the mapping lists them.
+    """
+    if not os.path.exists(mapping_file):
+        logging.warning(f"{framework} ATT&CK mapping file not found at {mapping_file}")
+        return {}
+    try:
+        with open(mapping_file, 'r') as f:
+            mapping_data = json.load(f)
+        if "controls" not in mapping_data:
+            raise ValueError("Invalid JSON structure: 'controls' key missing")
+        controls = {
+            control_id: details.get("techniques", [])
+            for control_id, details in mapping_data["controls"].items()
+        }
+        logging.info(f"Loaded {framework} ATT&CK mapping with {len(controls)} controls from {mapping_file}")
+        return controls
+    except (json.JSONDecodeError, ValueError) as e:
+        logging.error(f"Failed to load {framework} ATT&CK mapping: {e}")
+        return {}
+
+def nist_control(reference):
+    """Return the NIST SP 800-53 control a CCI reference cites (e.g. 'AC-2' for 'AC-2 (1)'), or None."""
+    if reference.creator == "NIST" and "SP 800-53" in reference.title:
+        parts = reference.index.split()
+        return parts[0] if parts else None
+    return None
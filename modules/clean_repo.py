@@ -48,20 +48,16 @@ def clean_up_files(config, disa_file, base_path):
     else:
         print("File does not exist")
 
-    # Clean non-XML files and empty directories
+    # Clean non-XML files and empty directories in one bottom-up pass
     for folder in [srg_folder, stig_folder]:
-        for subdir, dirs, files in os.walk(folder):
+        for subdir, dirs, files in os.walk(folder, topdown=False):
             for f in files:
                 if not f.endswith(config["xml_suffix"]):
                     file_path = os.path.join(subdir, f)
                     print(Fore.RED + f"Deleting {f} from {folder}")
                     os.remove(file_path)
-
-        for root, dirs, _ in os.walk(folder, topdown=False):
-            for directory in dirs:
-                dirpath = os.path.join(root, directory)
-                if not os.listdir(dirpath):
-                    os.rmdir(dirpath)
-                    print(Fore.RED + f"Deleting: {dirpath}")
+            if subdir != folder and not os.listdir(subdir):
+                os.rmdir(subdir)
+                print(Fore.RED + f"Deleting: {subdir}")
 
 print(Style.RESET_ALL)
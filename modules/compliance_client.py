@@ -0,0 +1,141 @@
+# compliance_client.py
+"""Thin client for compliance_daemon.py.
+
+Imports only the standard library so it starts in milliseconds; all the work happens in the
+daemon, which keeps the compliance corpus loaded.
+
+    python3 modules/compliance_client.py get CCI-000054
+    python3 modules/compliance_client.py search password complexity
+    python3 modules/compliance_client.py crosswalk T1078 --to rule --rule-type STIG
+    python3 modules/compliance_client.py coverage '*Windows_Server_2022*' --severity high --by severity
+    python3 modules/compliance_client.py ask "get CCI-000054"
+    python3 modules/compliance_client.py < prompts.txt    # one prompt per line, like the interactive tool
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+DEFAULT_SOCKET = os.path.join("data", "compliance.sock")
+
+class DaemonError(Exception):
+    """Raised when the daemon reports an error for a request."""
+
+class ComplianceClient:
+    """A connection to the compliance daemon that can carry any number of requests."""
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile("rb")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _send(self, request):
+        self.sock.sendall(json.dumps(request).encode() + b"\n")
+
+    def _receive(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Compliance daemon closed the connection")
+        return json.loads(line)
+
+    def call(self, op, **args):
+        """Send one request and return its result, raising DaemonError if it failed."""
+        self._send(dict(args, op=op))
+        reply = self._receive()
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error"))
+        return reply["result"]
+
+    def ask_stream(self, prompt):
+        """Yield answer text as the daemon streams it; returns the timings dict when done."""
+        self._send({"op": "ask", "prompt": prompt, "stream": True})
+        while True:
+            reply = self._receive()
+            if "text" in reply:
+                yield reply["text"]
+            elif reply.get("ok"):
+                return reply["result"]["timings"]
+            else:
+                raise DaemonError(reply.get("error"))
+
+def default_socket_path():
+    """Read the socket path from config.json without loading anything else."""
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        with open(os.path.join(base_path, "config.json"), 'r') as f:
+            path = json.load(f).get("daemon_socket", DEFAULT_SOCKET)
+    except (OSError, ValueError):
+        path = DEFAULT_SOCKET
+    return os.path.join(base_path, path)
+
+def print_ask(client, prompt, stream):
+    if not stream:
+        print(client.call("ask", prompt=prompt, stream=False)["answer"])
+        return
+    for text in client.ask_stream(prompt):
+        print(text, end="", flush=True)
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a running compliance daemon")
+    parser.add_argument("--socket", help="Socket path (default: config daemon_socket or data/compliance.sock)")
+    parser.add_argument("--json", action="store_true", help="Print search results as raw JSON")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for each complete answer instead of printing it as it streams")
+    parser.add_argument("-k", type=int, default=10, help="Number of search results (default: 10)")
+    parser.add_argument("--to", choices=["srg", "rule", "cci", "control", "technique"],
+                        help="crosswalk: list only linked entities of this kind")
+    parser.add_argument("--rule-type", choices=["STIG", "SRG"],
+                        help="crosswalk --to rule, coverage: keep only rules of this type")
+    parser.add_argument("--severity", action="append", help="coverage: keep only rules of this severity (repeatable)")
+    parser.add_argument("--by", choices=["benchmark", "severity", "type"], help="coverage: also break coverage down by this")
+    parser.add_argument("command", nargs="?", choices=["get", "search", "crosswalk", "coverage", "ask", "stats", "ping"],
+                        help="Omit to read prompts from stdin, one per line")
+    parser.add_argument("args", nargs="*")
+    args = parser.parse_intermixed_args()
+
+    path = args.socket or default_socket_path()
+    try:
+        client = ComplianceClient(path)
+    except OSError as e:
+        print(f"Error: cannot reach the compliance daemon at {path} ({e}). Start it with compliance_daemon.py.", file=sys.stderr)
+        sys.exit(2)
+    text = " ".join(args.args)
+    try:
+        with client:
+            if args.command is None:
+                for line in sys.stdin:
+                    if line.strip():
+                        print_ask(client, line.strip(), not args.no_stream)
+            elif args.command == "ask":
+                print_ask(client, text, not args.no_stream)
+            else:
+                params = {
+                    "get": {"item": text},
+                    "search": {"query": text, "k": args.k},
+                    "crosswalk": {"item": text, "to": args.to, "rule_type": args.rule_type},
+                    "coverage": {"benchmarks": args.args, "severities": args.severity, "rule_type": args.rule_type, "by": args.by}
+                }.get(args.command, {})
+                result = client.call(args.command, **params)
+                if args.json or args.command != "search":
+                    print(json.dumps(result, indent=2))
+                else:
+                    print(f"{result['total']} matches")
+                    for hit in result["hits"]:
+                        print(f"- {hit['id']} ({hit['type']}): {hit['text']}")
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# compliance_corpus.py
+import sys
+from array import array
+
+class Technique:
+    """An ATT&CK technique, stored once in ComplianceCorpus.techniques and referenced by index."""
+    __slots__ = ("id", "name", "description")
+
+    def __init__(self, id, name, description):
+        self.id = id
+        self.name = name
+        self.description = description
+
+class Rule:
+    """A STIG or SRG rule parsed from an XCCDF benchmark.
+
+    srg is the title of the rule's Group, which names the SRG requirement the rule
+    implements (e.g. 'SRG-OS-000480-GPOS-00227'), or None.
+    """
+    __slots__ = ("id", "type", "title", "description", "severity", "file", "ccis", "srg", "technique_ids")
+
+    def __init__(self, id, type, title, description, severity, file, ccis, srg=None):
+        self.id = id
+        self.type = type
+        self.title = title
+        self.description = description
+        self.severity = severity
+        self.file = file
+        self.ccis = ccis
+        self.srg = srg
+        self.technique_ids = array('I')
+
+class Reference:
+    """A policy reference (e.g. a NIST SP 800-53 control) attached to a CCI."""
+    __slots__ = ("creator", "title", "version", "location", "index")
+
+    def __init__(self, creator, title, version, location, index):
+        self.creator = creator
+        self.title = title
+        self.version = version
+        self.location = location
+        self.index = index
+
+class CCI:
+    """A Control Correlation Identifier parsed from the DISA CCI list."""
+    __slots__ = ("id", "definition", "cci_type", "status", "publishdate", "contributor", "references", "file", "technique_ids")
+    type = "CCI"
+
+    def __init__(self, id, definition, cci_type, status, publishdate, contributor, references, file):
+        self.id = id
+        self.definition = definition
+        self.cci_type = cci_type
+        self.status = status
+        self.publishdate = publishdate
+        self.contributor = contributor
+        self.references = references
+        self.file = file
+        self.technique_ids = array('I')
+
+class ComplianceCorpus:
+    """In-memory compliance library: rules and CCIs by id, a shared ATT&CK technique table and the acronym map.
+
+    Records hold technique indexes into self.techniques rather than their own copies, and
+    repeated strings (types, severities, file names, CCI ids, and rule text copied between
+    STIGs and SRGs) are interned as records are added.
+    """
+
+    def __init__(self, acronym_map=None):
+        self.items = {}
+        self.techniques = []
+        self.technique_index = {}
+        self.acronym_map = acronym_map if acronym_map is not None else {}
+        self.acronym_expander = None
+        self.version = None  # Fingerprint of the source files, used to validate derived indexes
+        self.search_index = None
+        self.vector_index = None
+        self.response_cache = None
+        self.crosswalk = None
+        self.coverage = None
+        self._citing = None  # CCI id -> rules that cite it, built on first use
+
+    def close(self):
+        """Release what this corpus holds open: its LLM response cache."""
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item_id):
+        return item_id in self.items
+
+    def __getitem__(self, item_id):
+        return self.items[item_id]
+
+    def get(self, item_id, default=None):
+        return self.items.get(item_id, default)
+
+    def add(self, record):
+        """Add a Rule or CCI, interning its repeated strings. A later record with the same id replaces the earlier one."""
+        record.id = sys.intern(record.id)
+        record.file = sys.intern(record.file)
+        if isinstance(record, Rule):
+            # STIG rules frequently repeat their SRG's title and description verbatim
+            record.title = sys.intern(record.title or "No title")
+            record.description = sys.intern(record.description or "No description")
+            record.type = sys.intern(record.type)
+            record.severity = sys.intern(record.severity)
+            record.ccis = tuple(sys.intern(cci) for cci in record.ccis)
+            record.srg = sys.intern(record.srg) if record.srg else None
+        else:
+            record.status = sys.intern(record.status)
+            record.cci_type = sys.intern(record.cci_type)
+            record.contributor = sys.intern(record.contributor)
+        self.items[record.id] = record
+        self._citing = None
+
+    def add_technique(self, tech_id, name, description):
+        """Return the index of an ATT&CK technique in the shared table, adding it on first sight."""
+        index = self.technique_index.get(tech_id)
+        if index is None:
+            index = len(self.techniques)
+            self.techniques.append(Technique(sys.intern(tech_id), name, description))
+            self.technique_index[tech_id] = index
+        return index
+
+    def techniques_for(self, record):
+        """Return the Technique objects referenced by a Rule or CCI."""
+        return [self.techniques[index] for index in record.technique_ids]
+
+    def rules(self):
+        """Iterate over STIG and SRG rules."""
+        return (item for item in self.items.values() if isinstance(item, Rule))
+
+    def rules_citing(self, cci_id):
+        """Return the rules that cite a CCI."""
+        if self._citing is None:
+            citing = {}
+            for rule in self.rules():
+                for cited in rule.ccis:
+                    citing.setdefault(cited, []).append(rule)
+            self._citing = citing
+        return self._citing.get(cci_id, [])
+
+    def ccis(self):
+        """Iterate over CCIs."""
+        return (item for item in self.items.values() if isinstance(item, CCI))
@@ -0,0 +1,241 @@
+# compliance_daemon.py
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import requests
+from compliance_corpus import Rule
+from compliance_llm import load_compliance_data, process_llm_prompt, stream_llm_prompt
+from corpus_snapshots import CorpusSnapshots
+
+DEFAULT_SOCKET = os.path.join("data", "compliance.sock")
+
+def socket_path(config):
+    """Return the daemon's socket path from config, relative to the repository root."""
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, config.get("daemon_socket", DEFAULT_SOCKET))
+
+def record_to_dict(corpus, record):
+    """Return a JSON-serializable view of a Rule or CCI."""
+    techniques = [tech.id for tech in corpus.techniques_for(record)]
+    if isinstance(record, Rule):
+        return {
+            "id": record.id, "type": record.type, "title": record.title, "description": record.description,
+            "severity": record.severity, "file": record.file, "ccis": list(record.ccis), "srg": record.srg,
+            "techniques": techniques
+        }
+    return {
+        "id": record.id, "type": record.type, "definition": record.definition, "cci_type": record.cci_type,
+        "status": record.status, "publishdate": record.publishdate, "contributor": record.contributor,
+        "references": [
+            {"creator": ref.creator, "title": ref.title, "version": ref.version, "location": ref.location, "index": ref.index}
+            for ref in record.references
+        ],
+        "file": record.file, "techniques": techniques
+    }
+
+class ComplianceRequestHandler(socketserver.StreamRequestHandler):
+    """Serve newline-delimited JSON requests on one client connection until it closes.
+
+    Each request is an object with an "op" ("ping", "stats", "get", "search", "crosswalk",
+    "coverage" or "ask") and its arguments; an optional "id" is echoed in every reply line. A
+    request gets one reply,
+    {"ok": true, "result": ...} or {"ok": false, "error": ...}, except a streamed "ask", which
+    first sends {"text": ...} lines as the answer arrives.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                self.reply({"ok": False, "error": f"Invalid request: {e}"})
+                continue
+            try:
+                self.dispatch(request)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as e:
+                logging.exception(f"Daemon request failed: {request}")
+                self.reply({"ok": False, "error": str(e)}, request)
+
+    def reply(self, message, request=None):
+        if request is not None and "id" in request:
+            message["id"] = request["id"]
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+
+    def dispatch(self, request):
+        server = self.server
+        # One snapshot per request: a refresh swapped in meanwhile applies to the next one
+        corpus = server.snapshots.current
+        op = request.get("op")
+        with server.stats_lock:
+            server.requests_served += 1
+        if op == "ping":
+            self.reply({"ok": True, "result": "pong"}, request)
+        elif op == "stats":
+            cache = corpus.response_cache
+            self.reply({"ok": True, "result": {
+                "items": len(corpus),
+                "version": corpus.version,
+                "snapshot_loaded": server.snapshots.loaded_at,
+                "snapshot_swaps": server.snapshots.swaps,
+                "uptime": time.time() - server.started,
+                "requests": server.requests_served,
+                "cache_hits": cache.hits if cache is not None else None,
+                "cache_misses": cache.misses if cache is not None else None
+            }}, request)
+        elif op == "get":
+            item_id = str(request.get("item", "")).strip()
+            item_id = corpus.acronym_expander.resolve(item_id) or item_id
+            record = corpus.get(item_id)
+            if record is None:
+                self.reply({"ok": False, "error": f"No data found for ID: {item_id}"}, request)
+            else:
+                self.reply({"ok": True, "result": record_to_dict(corpus, record)}, request)
+        elif op == "search":
+            query = str(request.get("query", "")).strip()
+            query = corpus.acronym_expander.resolve(query) or query
+            total, matches = corpus.search_index.search(query, k=int(request.get("k", 10)))
+            hits = []
+            for item_id, score in matches:
+                record = corpus[item_id]
+                text = record.title if isinstance(record, Rule) else record.definition
+                hits.append({"id": item_id, "type": record.type, "score": score, "text": text})
+            self.reply({"ok": True, "result": {"total": total, "hits": hits}}, request)
+        elif op == "crosswalk":
+            item_id = str(request.get("item", "")).strip()
+            found = corpus.crosswalk.find(item_id) if corpus.crosswalk is not None else None
+            if found is None:
+                self.reply({"ok": False, "error": f"No crosswalk entry for ID: {item_id}"}, request)
+            elif request.get("to"):
+                related = corpus.crosswalk.related(item_id, request["to"], request.get("rule_type"))
+                self.reply({"ok": True, "result": {"kind": found[0], request["to"]: related}}, request)
+            else:
+                kind, related = corpus.crosswalk.crosswalk(item_id)
+                self.reply({"ok": True, "result": dict(related, kind=kind)}, request)
+        elif op == "coverage":
+            matrix = corpus.coverage
+            if matrix is None:
+                self.reply({"ok": False, "error": "No ATT&CK coverage matrix is loaded"}, request)
+            else:
+                mask = matrix.rule_mask(request.get("benchmarks"), request.get("severities"), request.get("rule_type"))
+                result = matrix.summary(mask)
+                if request.get("by"):
+                    result["groups"] = matrix.coverage_by(request["by"], mask)
+                self.reply({"ok": True, "result": result}, request)
+        elif op == "ask":
+            prompt = str(request.get("prompt", "")).strip()
+            if not prompt:
+                self.reply({"ok": False, "error": "Missing 'prompt'"}, request)
+            elif request.get("stream", True):
+                timings = {}
+                try:
+                    for text in stream_llm_prompt(server.config, corpus, prompt, timings):
+                        self.reply({"text": text}, request)
+                except requests.RequestException as e:
+                    self.reply({"ok": False, "error": f"Error contacting OpenRouter: {e}"}, request)
+                    return
+                self.reply({"ok": True, "result": {"timings": timings}}, request)
+            else:
+                self.reply({"ok": True, "result": {"answer": process_llm_prompt(server.config, corpus, prompt)}}, request)
+        else:
+            self.reply({"ok": False, "error": f"Unknown op: {op!r}"}, request)
+
+class ComplianceDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix domain socket server that answers queries against the current corpus snapshot."""
+    daemon_threads = True
+
+    def __init__(self, path, config, snapshots):
+        self.config = config
+        self.snapshots = snapshots
+        self.started = time.time()
+        self.requests_served = 0
+        self.stats_lock = threading.Lock()
+        _remove_stale_socket(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Only the owner may connect: answers spend the owner's OpenRouter quota
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, ComplianceRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+def _remove_stale_socket(path):
+    """Delete a socket file left by a daemon that died, refusing to replace a live one."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"A compliance daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve compliance queries from a resident corpus over a Unix socket")
+    parser.add_argument("--socket", help="Socket path (default: config daemon_socket or data/compliance.sock)")
+    parser.add_argument("--rebuild-cache", action="store_true", help="Ignore the parse cache and re-parse all XML files")
+    parser.add_argument("--schedule", action="store_true",
+                        help="Run the weekly data refresh in this process and swap in the new data when it succeeds")
+    args = parser.parse_args()
+
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../config.json')
+    if not os.path.exists(config_path):
+        print("Error: config.json not found. Exiting.")
+        sys.exit(1)
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+
+    load_start = time.perf_counter()
+    corpus = load_compliance_data(config, use_cache=not args.rebuild_cache)
+    if not corpus:
+        print("Error: No compliance data found. Run data_fetcher.py first.")
+        sys.exit(1)
+    snapshots = CorpusSnapshots(config, corpus)
+    path = args.socket or socket_path(config)
+    try:
+        server = ComplianceDaemon(path, config, snapshots)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.schedule:
+        # Imported here so the daemon runs without the schedule package unless asked to schedule
+        from scheduler import start_scheduler_thread
+        start_scheduler_thread(on_success=snapshots.refresh_in_background)
+    elif config.get("snapshot_poll_seconds", 60):
+        # Pick up refreshes made by another process (the scheduler, data_fetcher.py, the web UI)
+        snapshots.watch(config.get("snapshot_poll_seconds", 60))
+    # serve_forever() must be stopped from another thread, so SIGTERM hands off to one
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logging.info(f"Compliance daemon serving {len(corpus)} items on {path}")
+    print(f"Compliance daemon serving {len(corpus)} items (loaded in {time.perf_counter() - load_start:.2f}s) on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        snapshots.current.close()
+        print("Compliance daemon stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,29 @@ import json
 from datetime import datetime, timedelta
 import logging
 import os
-import glob
-from lxml import etree
+import time
+import asyncio
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import pytz
 from pdf_parser import load_acronym_mapping  # Import from new module
+from xccdf_parser import list_source_files, parse_source_files
+from attack_mapping import attack_mapping_file, load_attack_mapping, nist_control
+from parse_cache import ParseCache, hash_file
+from compliance_corpus import ComplianceCorpus, Rule, CCI
+from search_index import load_search_index
+from acronym_expander import AcronymExpander
+from vector_index import get_embedder, load_vector_index
+from response_cache import ResponseCache
+from compliance_store import load_store_corpus
+from corpus_image import load_corpus_image
+from crosswalk import load_crosswalk
+from coverage import load_coverage
+from context_packer import DEFAULT_TOKEN_BUDGET, SEARCH_CANDIDATES, ContextPacker, pack_rule, pack_cci, pack_crosswalk, pack_hits
+
+# (connect, read) timeout in seconds for OpenRouter requests; a long answer can take minutes to start
+OPENROUTER_TIMEOUT = (10, 300)
 
 # Configure logging
 logging.basicConfig(
@@ -43,243 +61,215 @@ def check_data_freshness(config, max_age_days=7):
         logging.error(f"Error reading last_processed.json: {e}")
         return False
 
-def load_compliance_data(config):
-    """Load compliance data including NIST ATT&CK mappings and acronym mappings."""
-    data = {}
-    base_path = os.path.dirname(os.path.dirname(__file__))
-    namespaces = {
-        "xccdf": "http://checklists.nist.gov/xccdf/1.1",
-        "cci": "http://iase.disa.mil/cci"
+def parse_cache_path(config, base_path):
+    """Return the parse cache file; the search, crosswalk, coverage and vector indexes are cached beside it."""
+    return os.path.join(base_path, config.get("parse_cache_file", os.path.join("data", "cache", "parse_cache.pkl")))
+
+def attach_indexes(corpus, config, base_path):
+    """Attach the crosswalk graph, the ATT&CK coverage matrix and the vector index (if an embedder is configured) to a loaded corpus."""
+    cache_dir = os.path.dirname(parse_cache_path(config, base_path))
+    framework, mapping_file = attack_mapping_file(config, base_path)
+    corpus.crosswalk = load_crosswalk(corpus, os.path.join(cache_dir, "crosswalk.pkl"), framework, mapping_file)
+    corpus.coverage = load_coverage(corpus, os.path.join(cache_dir, "coverage.pkl"))
+    if config.get("vector_embedder"):
+        corpus.vector_index = load_vector_index(
+            corpus,
+            os.path.join(cache_dir, "vector_index.pkl"),
+            get_embedder(config),
+            quantize=config.get("vector_quantize", False)
+        )
+
+def open_response_cache(corpus, config, base_path=None):
+    """Attach the LLM response cache to a loaded corpus.
+
+    The cache is shared by every process and cleared when opened for a different corpus
+    version, so open it only for a corpus that is going to be used.
+    """
+    base_path = base_path or os.path.dirname(os.path.dirname(__file__))
+    response_cache_file = config.get("response_cache_file", "data/cache/responses.sqlite3")
+    if response_cache_file:
+        corpus.response_cache = ResponseCache(
+            os.path.join(base_path, response_cache_file),
+            corpus.version,
+            max_entries=config.get("response_cache_max_entries", 1000),
+            ttl_seconds=config.get("response_cache_ttl_hours", 168) * 3600
+        )
+
+def build_compliance_corpus(config, base_path, use_cache=True):
+    """Parse the library into an in-memory ComplianceCorpus, with its acronym expander and search index.
+
+    Parsed STIG, SRG and CCI files are kept in a per-file parse cache so a warm start
+    only re-parses files that changed since the last run. Pass use_cache=False to
+    re-parse everything (the cache is still rewritten for the next run). Files that
+    do need parsing are spread across a process pool (see parse_source_files).
+    """
+    # Load acronym mapping from pdf_parser.py and precompile it for prompt expansion
+    corpus = ComplianceCorpus(load_acronym_mapping(workers=config.get("ingest_workers", 0)))
+    corpus.acronym_expander = AcronymExpander(corpus.acronym_map)
+
+    # Load NIST ATT&CK Mapping into the shared technique table
+    framework, mapping_file = attack_mapping_file(config, base_path)
+    nist_to_attack = {
+        control_id: array('I', (corpus.add_technique(tech["id"], tech["name"], tech.get("description", "")) for tech in techniques))
+        for control_id, techniques in load_attack_mapping(framework, mapping_file).items()
     }
 
-    # Load acronym mapping from pdf_parser.py
-    acronym_map = load_acronym_mapping()
-    data['acronym_map'] = acronym_map
-
-    # Determine the framework and corresponding mapping file
-    framework = config.get("framework", "nist_800_53_rev5")
-    mapping_filename = {
-        "nist_800_53_rev5": "nist_800_53-rev5_attack-14.1-enterprise_json.json",
-        "nist_800_53_rev4": "nist_800_53-rev4_attack-14.1-enterprise_json.json",
-        "cis": "cis_json.json"
-    }.get(framework, "nist_800_53-rev5_attack-14.1-enterprise_json.json")
-    mapping_file = os.path.join(base_path, "data", mapping_filename)
-
-    # Load NIST ATT&CK Mapping
-    nist_to_attack = {}
-    if os.path.exists(mapping_file):
-        try:
-            with open(mapping_file, 'r') as f:
-                mapping_data = json.load(f)
-            if "controls" not in mapping_data:
-                raise ValueError("Invalid JSON structure: 'controls' key missing")
-            for control_id, details in mapping_data["controls"].items():
-                nist_to_attack[control_id] = [
-                    {"id": tech["id"], "name": tech["name"], "description": tech.get("description", "")}
-                    for tech in details.get("techniques", [])
-                ]
-            logging.info(f"Loaded {framework} ATT&CK mapping with {len(nist_to_attack)} controls from {mapping_file}")
-        except (json.JSONDecodeError, ValueError) as e:
-            logging.error(f"Failed to load {framework} ATT&CK mapping: {e}")
-    else:
-        logging.warning(f"{framework} ATT&CK mapping file not found at {mapping_file}")
+    cache_file = parse_cache_path(config, base_path)
+    cache = ParseCache(cache_file)
+    if use_cache:
+        cache.load()
 
-    # Load STIG data
-    stig_dir = os.path.join(base_path, config["stig_dir"])
-    for xml_file in glob.glob(os.path.join(stig_dir, "*.xml")):
-        try:
-            tree = etree.parse(xml_file)
-            rules = tree.findall(".//xccdf:Group/xccdf:Rule", namespaces)
-            for rule in rules:
-                control_id = rule.get("id")
-                title_elem = rule.find("xccdf:title", namespaces)
-                title = title_elem.text if title_elem is not None else "No title"
-                desc_elem = rule.find("xccdf:description", namespaces)
-                description = desc_elem.text if desc_elem is not None else "No description"
-                cci_elems = rule.findall("xccdf:ident[@system='http://cyber.mil/cci']", namespaces)
-                ccis = [cci.text for cci in cci_elems if cci.text] if cci_elems else []
-                data[control_id] = {
-                    "title": title,
-                    "description": description,
-                    "type": "STIG",
-                    "file": os.path.basename(xml_file),
-                    "ccis": ccis,
-                    "attack_techniques": []
-                }
-            logging.info(f"Parsed STIG file {xml_file} with {len(rules)} items")
-        except Exception as e:
-            logging.error(f"Failed to parse STIG file {xml_file}: {e}")
-
-    # Load SRG data
-    srg_dir = os.path.join(base_path, config["srg_dir"])
-    for xml_file in glob.glob(os.path.join(srg_dir, "*.xml")):
-        try:
-            tree = etree.parse(xml_file)
-            rules = tree.findall(".//xccdf:Group/xccdf:Rule", namespaces)
-            for rule in rules:
-                control_id = rule.get("id")
-                title_elem = rule.find("xccdf:title", namespaces)
-                title = title_elem.text if title_elem is not None else "No title"
-                desc_elem = rule.find("xccdf:description", namespaces)
-                description = desc_elem.text if desc_elem is not None else "No description"
-                cci_elems = rule.findall("xccdf:ident[@system='http://cyber.mil/cci']", namespaces)
-                ccis = [cci.text for cci in cci_elems if cci.text] if cci_elems else []
-                data[control_id] = {
-                    "title": title,
-                    "description": description,
-                    "type": "SRG",
-                    "file": os.path.basename(xml_file),
-                    "ccis": ccis,
-                    "attack_techniques": []
-                }
-            logging.info(f"Parsed SRG file {xml_file} with {len(rules)} items")
-        except Exception as e:
-            logging.error(f"Failed to parse SRG file {xml_file}: {e}")
-
-    # Load CCI data and map ATT&CK techniques
-    cci_dir = os.path.join(base_path, config["cci_list_dir"])
-    for xml_file in glob.glob(os.path.join(cci_dir, "*.xml")):
-        try:
-            tree = etree.parse(xml_file)
-            cci_items = tree.findall(".//cci:cci_item", namespaces)
-            for cci_item in cci_items:
-                cci_id = cci_item.get("id")
-                if not cci_id:
-                    logging.warning(f"Skipping cci_item with no id in {xml_file}")
-                    continue
-                definition_elem = cci_item.find("cci:definition", namespaces)
-                definition = definition_elem.text if definition_elem is not None else "No definition"
-                type_elem = cci_item.find("cci:type", namespaces)
-                cci_type = type_elem.text if type_elem is not None else "Unknown type"
-                status_elem = cci_item.find("cci:status", namespaces)
-                status = status_elem.text if status_elem is not None else "Unknown status"
-                publishdate_elem = cci_item.find("cci:publishdate", namespaces)
-                publishdate = publishdate_elem.text if publishdate_elem is not None else "Unknown date"
-                contributor_elem = cci_item.find("cci:contributor", namespaces)
-                contributor = contributor_elem.text if contributor_elem is not None else "Unknown contributor"
-                references = [
-                    {
-                        "creator": ref.get("creator", "Unknown creator"),
-                        "title": ref.get("title", "No title"),
-                        "version": ref.get("version", "Unknown version"),
-                        "location": ref.get("location", "No location"),
-                        "index": ref.get("index", "No index")
-                    }
-                    for ref in cci_item.findall("cci:references/cci:reference", namespaces)
-                ]
-                attack_techniques = []
-                for ref in references:
-                    if ref["creator"] == "NIST" and "SP 800-53" in ref["title"]:
-                        nist_control = ref["index"].split()[0]
-                        if nist_control in nist_to_attack:
-                            attack_techniques.extend(nist_to_attack[nist_control])
-                data[cci_id] = {
-                    "type": "CCI",
-                    "definition": definition,
-                    "cci_type": cci_type,
-                    "status": status,
-                    "publishdate": publishdate,
-                    "contributor": contributor,
-                    "references": references,
-                    "file": os.path.basename(xml_file),
-                    "attack_techniques": attack_techniques
-                }
-            logging.info(f"Parsed CCI file {xml_file} with {len(cci_items)} items")
-        except Exception as e:
-            logging.error(f"Failed to parse CCI file {xml_file}: {e}")
-
-    # Propagate ATT&CK techniques to STIGs and SRGs via CCIs, skipping non-compliance items
-    for item_id, item in data.items():
-        if 'type' not in item:  # Skip items like 'acronym_map'
+    # Load STIG and SRG data, then the CCI list
+    source_files = list_source_files(config, base_path)
+    parsed = {}
+    pending = []
+    for xml_file, item_type in source_files:
+        records = cache.get(xml_file)
+        if records is None:
+            pending.append((xml_file, item_type))
+        else:
+            parsed[xml_file] = records
+
+    for (xml_file, item_type), (records, sha256, error) in zip(pending, parse_source_files(pending, config)):
+        if error:
+            logging.error(f"Failed to parse {item_type} file {xml_file}: {error}")
             continue
-        if item["type"] in ["STIG", "SRG"] and "ccis" in item:
-            attack_techniques = []
-            for cci in item["ccis"]:
-                if cci in data and "attack_techniques" in data[cci]:
-                    attack_techniques.extend(data[cci]["attack_techniques"])
-            item["attack_techniques"] = list({t["id"]: t for t in attack_techniques}.values())
+        cache.put(xml_file, records, sha256)
+        parsed[xml_file] = records
+        logging.info(f"Parsed {item_type} file {xml_file} with {len(records)} items")
+    cache.prune([xml_file for xml_file, _ in source_files])
+    cache.save()
+    mapping_hash = hash_file(mapping_file) if os.path.exists(mapping_file) else ""
+    corpus.version = cache.fingerprint([xml_file for xml_file, _ in source_files], [framework, mapping_hash])
 
-    return data
+    for xml_file, _ in source_files:
+        for record in parsed.get(xml_file, {}).values():
+            corpus.add(record)
 
-def process_llm_prompt(config, compliance_data, prompt):
-    """Process a user prompt using OpenRouter API with compliance data context."""
-    acronym_map = compliance_data.get('acronym_map', {})
-    context = "Compliance Data Context:\n"
+    # Map ATT&CK techniques to CCIs via their NIST SP 800-53 references
+    for cci in corpus.ccis():
+        technique_ids = []
+        for ref in cci.references:
+            control_id = nist_control(ref)
+            if control_id in nist_to_attack:
+                technique_ids.extend(nist_to_attack[control_id])
+        cci.technique_ids = array('I', dict.fromkeys(technique_ids))
+
+    # Propagate ATT&CK techniques to STIGs and SRGs via their CCIs
+    for rule in corpus.rules():
+        technique_ids = []
+        for cci_id in rule.ccis:
+            cci = corpus.get(cci_id)
+            if isinstance(cci, CCI):
+                technique_ids.extend(cci.technique_ids)
+        rule.technique_ids = array('I', dict.fromkeys(technique_ids))
+
+    corpus.search_index = load_search_index(corpus, os.path.join(os.path.dirname(cache_file), "search_index.pkl"))
+    logging.info(f"Parsed corpus: {cache.hits} files from cache, {cache.misses} parsed")
+    return corpus
+
+def load_compliance_data(config, use_cache=True, response_cache=True):
+    """Load compliance data including NIST ATT&CK mappings and acronym mappings.
+
+    config corpus_backend selects where the corpus comes from:
+        memory  parse the library into a ComplianceCorpus (see build_compliance_corpus)
+        sqlite  read it from the compliance store, brought up to date first (see compliance_store.py)
+        mmap    map a shared corpus image, rebuilt from a parsed corpus when the library changed (see corpus_image.py)
+    use_cache=False forces a cold rebuild in every case. With response_cache=False the LLM
+    response cache is left for the caller to open with open_response_cache.
+    """
+    start_time = time.perf_counter()
+    base_path = os.path.dirname(os.path.dirname(__file__))
+
+    backend = config.get("corpus_backend", "memory")
+    if backend == "sqlite":
+        corpus = load_store_corpus(config, base_path, rebuild=not use_cache)
+        corpus.acronym_expander = AcronymExpander(corpus.acronym_map)
+    elif backend == "mmap":
+        corpus = load_corpus_image(config, base_path, lambda: build_compliance_corpus(config, base_path, use_cache), rebuild=not use_cache)
+        corpus.acronym_expander = AcronymExpander(corpus.acronym_map)
+        if corpus.search_index is None:
+            corpus.search_index = load_search_index(corpus, os.path.join(os.path.dirname(parse_cache_path(config, base_path)), "search_index.pkl"))
+    else:
+        corpus = build_compliance_corpus(config, base_path, use_cache)
+    attach_indexes(corpus, config, base_path)
+    if response_cache:
+        open_response_cache(corpus, config, base_path)
+
+    elapsed = time.perf_counter() - start_time
+    logging.info(f"Loaded {len(corpus)} compliance items and {len(corpus.techniques)} ATT&CK techniques "
+                 f"from the {backend} backend in {elapsed:.2f}s")
+    return corpus
+
+def build_llm_context(compliance_data, prompt, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Expand a user prompt and assemble its compliance data context within about token_budget tokens.
+
+    Returns (expanded_prompt, context), or (None, message) when a get/search finds nothing
+    and no LLM call is needed.
+    """
+    acronyms = compliance_data.acronym_expander
+    packer = ContextPacker(token_budget)
+    packer.add("Compliance Data Context:", required=True)
 
     # Expand acronyms in the prompt
-    expanded_prompt = prompt
-    for acronym, meaning in acronym_map.items():
-        if acronym in prompt.upper():
-            expanded_prompt = expanded_prompt.replace(acronym, f"{acronym} ({meaning})")
-            logging.info(f"Expanded '{acronym}' to '{acronym} ({meaning})' in prompt")
+    expanded_prompt = acronyms.expand(prompt)
 
     if prompt.startswith("get "):
         item_id = prompt.replace("get ", "").strip()
         # Check if item_id matches an acronym and expand it
-        for acronym, meaning in acronym_map.items():
-            if item_id.upper() == acronym:
-                item_id = meaning
-                logging.info(f"Resolved '{prompt.replace('get ', '')}' to '{meaning}'")
-                break
+        meaning = acronyms.resolve(item_id)
+        if meaning:
+            item_id = meaning
+            logging.info(f"Resolved '{prompt.replace('get ', '')}' to '{meaning}'")
         if item_id in compliance_data:
             data = compliance_data[item_id]
-            item_type = data["type"]
-            if item_type in ["STIG", "SRG"]:
-                context += (f"Control ID: {item_id}\n"
-                            f"Type: {item_type}\n"
-                            f"Title: {data['title']}\n"
-                            f"Description: {data['description'][:500]}... (truncated)\n"
-                            f"CCIs: {', '.join(data['ccis']) if 'ccis' in data and data['ccis'] else 'None'}\n"
-                            f"Source File: {data['file']}\n")
-            elif item_type == "CCI":
-                ref_titles = [ref['title'] for ref in data['references']] if data['references'] else ["None"]
-                context += (f"CCI ID: {item_id}\n"
-                            f"Type: {item_type}\n"
-                            f"Definition: {data['definition'][:500]}... (truncated)\n"
-                            f"CCI Type: {data['cci_type']}\n"
-                            f"Status: {data['status']}\n"
-                            f"Publish Date: {data['publishdate']}\n"
-                            f"Contributor: {data['contributor']}\n"
-                            f"References: {', '.join(ref_titles)}\n"
-                            f"Source File: {data['file']}\n")
+            if isinstance(data, Rule):
+                pack_rule(packer, compliance_data, data)
+            elif isinstance(data, CCI):
+                pack_cci(packer, compliance_data, data)
             else:
-                context += f"Unknown item type for ID: {item_id}\n"
-            if "attack_techniques" in data and data["attack_techniques"]:
-                context += "Mitigated ATT&CK Techniques:\n"
-                for tech in data["attack_techniques"]:
-                    context += f"  - {tech['id']}: {tech['name']} - {tech['description'][:100]}...\n"
+                packer.add(f"Unknown item type for ID: {item_id}", required=True)
+        elif compliance_data.crosswalk is not None and compliance_data.crosswalk.find(item_id):
+            # An ATT&CK technique, NIST control or SRG requirement: pack what links to it
+            pack_crosswalk(packer, compliance_data, item_id)
         else:
-            return f"No data found for ID: {item_id}"
+            return None, f"No data found for ID: {item_id}"
     elif "search" in prompt:
         keyword = prompt.replace("search ", "").strip()
         # Expand keyword if it’s an acronym
-        for acronym, meaning in acronym_map.items():
-            if keyword.upper() == acronym:
-                keyword = meaning
-                logging.info(f"Expanded search keyword '{prompt.replace('search ', '')}' to '{meaning}'")
-                break
-        matches = [
-            (cid, d) for cid, d in compliance_data.items()
-            if cid != 'acronym_map' and (
-                keyword.lower() in d.get('title', '').lower() or
-                keyword.lower() in d.get('description', '').lower() or
-                keyword.lower() in d.get('definition', '').lower()
-            )
-        ]
+        meaning = acronyms.resolve(keyword)
+        if meaning:
+            keyword = meaning
+            logging.info(f"Expanded search keyword '{prompt.replace('search ', '')}' to '{meaning}'")
+        total, matches = compliance_data.search_index.search(keyword, k=SEARCH_CANDIDATES)
         if matches:
-            context += f"Found {len(matches)} matches for '{keyword}':\n"
-            for cid, d in matches[:3]:  # Limit to 3 for brevity
-                item_type = d["type"]
-                if item_type in ["STIG", "SRG"]:
-                    context += f"- {cid} ({item_type}): {d['title'][:100]}...\n"
-                elif item_type == "CCI":
-                    context += f"- {cid} ({item_type}): {d['definition'][:100]}...\n"
+            packer.add(f"Found {total} matches for '{keyword}', most relevant first:", required=True)
+            pack_hits(packer, compliance_data, matches)
+        elif compliance_data.vector_index is not None:
+            # No shared keywords; fall back to the closest items in embedding space
+            similar = [(cid, score) for cid, score in compliance_data.vector_index.search_text(keyword, k=SEARCH_CANDIDATES) if score > 0]
+            if not similar:
+                return None, f"No matches found for '{keyword}'"
+            packer.add(f"No keyword matches for '{keyword}'; closest items by semantic similarity:", required=True)
+            pack_hits(packer, compliance_data, similar, similarity=True)
         else:
-            return f"No matches found for '{keyword}'"
+            return None, f"No matches found for '{keyword}'"
     else:
-        context += f"Total items loaded: {len(compliance_data) - 1}\n"  # Subtract acronym_map
+        packer.add(f"Total items loaded: {len(compliance_data)}", required=True)
+
+    context = packer.render()
+    logging.info(f"Packed context to ~{packer.used} of {token_budget} tokens")
+    return expanded_prompt, context
+
+def format_llm_prompt(expanded_prompt, context):
+    """Combine the compliance context and the user's query into the prompt sent to the model."""
+    return f"{context}\nUser Query: {expanded_prompt}\nProvide a concise, accurate response based on the context."
+
+def call_openrouter(config, full_prompt, session=None):
+    """Send a chat completion request to OpenRouter and return the answer text.
 
-    full_prompt = f"{context}\nUser Query: {expanded_prompt}\nProvide a concise, accurate response based on the context."
+    Raises requests.RequestException on failure. Pass a requests.Session to reuse connections.
+    """
     headers = {
         "Authorization": f"Bearer {config['OPENROUTER_API_KEY']}",
         "Content-Type": "application/json"
@@ -288,22 +278,247 @@ def process_llm_prompt(config, compliance_data, prompt):
         "model": config["DEEPSEEK_MODEL"],
         "messages": [{"role": "user", "content": full_prompt}]
     }
-    try:
-        response = requests.post(
-            f"{config['OPENROUTER_BASE_URL']}/chat/completions",
-            headers=headers,
-            json=payload
-        )
+    response = (session or requests).post(
+        f"{config['OPENROUTER_BASE_URL']}/chat/completions",
+        headers=headers,
+        json=payload,
+        timeout=OPENROUTER_TIMEOUT
+    )
+    response.raise_for_status()
+    result = response.json()
+    return result['choices'][0]['message']['content'].strip()
+
+def stream_openrouter(config, full_prompt, session=None):
+    """Yield answer text from OpenRouter's server-sent-event chat completion stream as it arrives.
+
+    Raises requests.RequestException on failure, including errors reported mid-stream.
+    """
+    headers = {
+        "Authorization": f"Bearer {config['OPENROUTER_API_KEY']}",
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream"
+    }
+    payload = {
+        "model": config["DEEPSEEK_MODEL"],
+        "messages": [{"role": "user", "content": full_prompt}],
+        "stream": True
+    }
+    with (session or requests).post(
+        f"{config['OPENROUTER_BASE_URL']}/chat/completions",
+        headers=headers,
+        json=payload,
+        stream=True,
+        timeout=OPENROUTER_TIMEOUT
+    ) as response:
         response.raise_for_status()
-        result = response.json()
-        return result['choices'][0]['message']['content'].strip()
+        for line in response.iter_lines(decode_unicode=True):
+            # Blank lines separate events; lines starting with ':' are keep-alive comments
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                event = json.loads(data)
+            except ValueError as e:
+                raise requests.RequestException(f"Unreadable OpenRouter stream event {data!r}: {e}") from e
+            if not isinstance(event, dict):
+                raise requests.RequestException(f"Unexpected OpenRouter stream event: {data!r}")
+            if "error" in event:
+                error = event["error"]
+                message = error.get("message", error) if isinstance(error, dict) else error
+                raise requests.RequestException(f"OpenRouter stream error: {message}")
+            choices = event.get("choices") or [{}]
+            text = (choices[0].get("delta") or {}).get("content")
+            if text:
+                yield text
+
+def stream_llm_prompt(config, compliance_data, prompt, timings=None):
+    """Yield the answer to a user prompt piece by piece as OpenRouter streams it.
+
+    Cached answers and lookup misses are yielded whole. If a timings dict is given it is
+    filled with time to first token ('ttft'), total latency ('total') and where the answer
+    came from ('source': 'api', 'cache' or 'lookup'); API timings are also logged. The complete streamed answer is stored in the response cache.
+    Raises requests.RequestException if the API call fails.
+    """
+    start_time = time.perf_counter()
+    timings = timings if timings is not None else {}
+    timings.update(ttft=None, total=None, source="api")
+    expanded_prompt, context = build_llm_context(compliance_data, prompt, config.get("context_token_budget", DEFAULT_TOKEN_BUDGET))
+    cache = compliance_data.response_cache
+    answer = None
+    if expanded_prompt is None:
+        answer = context
+        timings["source"] = "lookup"
+    elif cache is not None:
+        cache_key = cache.key(config["DEEPSEEK_MODEL"], expanded_prompt, context)
+        answer = cache.get(cache_key)
+        if answer is not None:
+            timings["source"] = "cache"
+    if answer is not None:
+        timings["ttft"] = timings["total"] = time.perf_counter() - start_time
+        yield answer
+        return
+
+    pieces = []
+    for text in stream_openrouter(config, format_llm_prompt(expanded_prompt, context)):
+        if timings["ttft"] is None:
+            timings["ttft"] = time.perf_counter() - start_time
+        pieces.append(text)
+        yield text
+    timings["total"] = time.perf_counter() - start_time
+    logging.info(f"Streamed answer for '{prompt}': first token {timings['ttft'] or 0:.2f}s, total {timings['total']:.2f}s")
+    if cache is not None and pieces:
+        cache.put(cache_key, "".join(pieces).strip())
+
+def process_llm_prompt(config, compliance_data, prompt):
+    """Process a user prompt using OpenRouter API with compliance data context."""
+    start_time = time.perf_counter()
+    expanded_prompt, context = build_llm_context(compliance_data, prompt, config.get("context_token_budget", DEFAULT_TOKEN_BUDGET))
+    if expanded_prompt is None:
+        return context
+    cache = compliance_data.response_cache
+    if cache is not None:
+        cache_key = cache.key(config["DEEPSEEK_MODEL"], expanded_prompt, context)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logging.info(f"Response cache hit ({cache.hits} hits, {cache.misses} misses)")
+            return cached
+    try:
+        answer = call_openrouter(config, format_llm_prompt(expanded_prompt, context))
     except requests.RequestException as e:
         logging.error(f"OpenRouter API error: {e}")
         return f"Error contacting OpenRouter: {str(e)}"
+    logging.info(f"Answered '{prompt}' in {time.perf_counter() - start_time:.2f}s")
+    if cache is not None:
+        cache.put(cache_key, answer)
+    return answer
+
+class RateLimiter:
+    """Async limiter that spaces request starts at least 60 / requests_per_minute seconds apart."""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def read_batch_checkpoint(output_file):
+    """Return how many results output_file already holds, trimming a partially written last line."""
+    if not os.path.exists(output_file):
+        return 0
+    with open(output_file, 'rb+') as f:
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            f.truncate(complete)
+    return data[:complete].count(b"\n")
+
+async def _answer_batch_item(config, compliance_data, item, limiter, executor, session, max_attempts=3):
+    """Answer one batch item, consulting the response cache before spending a rate-limited request."""
+    expanded_prompt, context = build_llm_context(
+        compliance_data, item["prompt"], config.get("context_token_budget", DEFAULT_TOKEN_BUDGET)
+    )
+    if expanded_prompt is None:
+        return {**item, "response": context, "cached": False}
+    cache = compliance_data.response_cache
+    cache_key = cache.key(config["DEEPSEEK_MODEL"], expanded_prompt, context) if cache is not None else None
+    cached = cache.get(cache_key) if cache is not None else None
+    if cached is not None:
+        return {**item, "response": cached, "cached": True}
+
+    full_prompt = format_llm_prompt(expanded_prompt, context)
+    loop = asyncio.get_running_loop()
+    for attempt in range(1, max_attempts + 1):
+        await limiter.wait()
+        try:
+            answer = await loop.run_in_executor(executor, call_openrouter, config, full_prompt, session)
+            break
+        except requests.RequestException as e:
+            status = e.response.status_code if e.response is not None else None
+            if attempt == max_attempts or (status is not None and status != 429 and status < 500):
+                logging.error(f"OpenRouter API error for batch prompt '{item['prompt']}': {e}")
+                return {**item, "error": str(e)}
+            # Back off on rate limiting, server errors and dropped connections
+            retry_after = e.response.headers.get("Retry-After") if e.response is not None else None
+            await asyncio.sleep(float(retry_after) if retry_after and retry_after.isdigit() else 5 * 2 ** (attempt - 1))
+        except (KeyError, IndexError, TypeError) as e:
+            # A 200 response without choices, e.g. an {"error": ...} body
+            logging.error(f"Malformed OpenRouter response for batch prompt '{item['prompt']}': {e!r}")
+            return {**item, "error": f"Malformed OpenRouter response: {e!r}"}
+    if cache is not None:
+        cache.put(cache_key, answer)
+    return {**item, "response": answer, "cached": False}
+
+async def run_batch(config, compliance_data, input_file, output_file, concurrency=8, requests_per_minute=20):
+    """Answer every prompt in a JSONL file concurrently and write results to output_file in input order.
+
+    Each input line is an object with a "prompt" key (other keys, e.g. an id, are copied to
+    the result) or a bare JSON string. Results are appended in input order as soon as all
+    earlier ones are done, so after an interruption the output file is itself the
+    checkpoint: rerunning resumes after its last complete line.
+    """
+    items = []
+    with open(input_file, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not isinstance(item, dict) or not isinstance(item.get("prompt"), str):
+                raise ValueError(f"{input_file} line {line_number}: expected a prompt string or an object with a 'prompt' key")
+            items.append(item)
+
+    done = read_batch_checkpoint(output_file)
+    if done:
+        print(f"Resuming after {done} completed prompts in {output_file}.")
+    remaining = len(items) - done
+    if remaining <= 0:
+        print(f"All {len(items)} prompts already answered in {output_file}.")
+        return
+
+    limiter = RateLimiter(requests_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+    next_index = done
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor, requests.Session() as session, \
+            open(output_file, 'a') as out:
+        async def worker(index, item):
+            nonlocal next_index
+            async with semaphore:
+                results[index] = await _answer_batch_item(config, compliance_data, item, limiter, executor, session)
+            # Write the contiguous run of finished results so the file stays in input order
+            while next_index in results:
+                out.write(json.dumps(results.pop(next_index)) + "\n")
+                next_index += 1
+            out.flush()
+            finished = next_index - done
+            if finished and finished % 50 == 0:
+                print(f"Answered {finished}/{remaining} prompts...")
+
+        await asyncio.gather(*(worker(index, items[index]) for index in range(done, len(items))))
+    elapsed = time.perf_counter() - start_time
+    logging.info(f"Batch answered {remaining} prompts from {input_file} in {elapsed:.1f}s")
+    print(f"Answered {remaining} prompts in {elapsed:.1f}s; results written to {output_file}.")
 
 def main():
     parser = argparse.ArgumentParser(description="Compliance LLM Tool")
     parser.add_argument("--update", action="store_true", help="Update compliance data before running")
+    parser.add_argument("--rebuild-cache", action="store_true", help="Ignore the parse cache and re-parse all XML files")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for each complete answer instead of printing it as it streams")
+    parser.add_argument("--batch", metavar="INPUT_JSONL", help="Answer every prompt in a JSONL file instead of running interactively")
+    parser.add_argument("--output", metavar="OUTPUT_JSONL", help="Where --batch writes results (default: <input>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, help="Concurrent requests in batch mode (default: config batch_concurrency or 8)")
+    parser.add_argument("--rate-limit", type=float, help="Maximum requests per minute in batch mode (default: config batch_requests_per_minute or 20)")
     args = parser.parse_args()
 
     logging.info("Starting compliance LLM tool.")
@@ -353,14 +568,25 @@ def main():
 
     # Load compliance data
     logging.info("Loading compliance data...")
-    compliance_data = load_compliance_data(config)
-    if not compliance_data or len(compliance_data) <= 1:  # Only acronym_map
+    load_start = time.perf_counter()
+    compliance_data = load_compliance_data(config, use_cache=not args.rebuild_cache)
+    load_time = time.perf_counter() - load_start
+    if not compliance_data:
         logging.warning("No compliance data loaded. Functionality may be limited.")
         print("Warning: No compliance data found. Functionality may be limited.")
         sys.exit(1)
     else:
-        logging.info(f"Loaded {len(compliance_data) - 1} compliance items.")
-        print(f"Compliance LLM tool running with {len(compliance_data) - 1} items loaded.")
+        logging.info(f"Loaded {len(compliance_data)} compliance items.")
+        print(f"Compliance LLM tool running with {len(compliance_data)} items loaded in {load_time:.2f}s.")
+
+    if args.batch:
+        output_file = args.output or os.path.splitext(args.batch)[0] + ".results.jsonl"
+        asyncio.run(run_batch(
+            config, compliance_data, args.batch, output_file,
+            concurrency=args.concurrency or config.get("batch_concurrency", 8),
+            requests_per_minute=args.rate_limit if args.rate_limit is not None else config.get("batch_requests_per_minute", 20)
+        ))
+        return
 
     # Interactive LLM prompt loop
     print("Welcome to the Compliance LLM Tool! Type 'exit' to quit.")
@@ -369,10 +595,29 @@ def main():
     while True:
         prompt = input("Enter your query: ").strip()
         if prompt.lower() == "exit":
+            if compliance_data.response_cache is not None:
+                cache = compliance_data.response_cache
+                print(f"Response cache: {cache.hits} hits, {cache.misses} misses.")
             print("Exiting Compliance LLM Tool.")
             break
-        response = process_llm_prompt(config, compliance_data, prompt)
-        print(response)
+        if args.no_stream:
+            response = process_llm_prompt(config, compliance_data, prompt)
+            print(response)
+        else:
+            timings = {}
+            pieces = []
+            try:
+                for text in stream_llm_prompt(config, compliance_data, prompt, timings):
+                    pieces.append(text)
+                    print(text, end="", flush=True)
+                print()
+                if timings["source"] == "api" and timings["total"] is not None:
+                    print(f"(first token {timings['ttft'] or 0:.2f}s, total {timings['total']:.2f}s)")
+            except requests.RequestException as e:
+                logging.error(f"OpenRouter API error: {e}")
+                pieces.append(f"Error contacting OpenRouter: {str(e)}")
+                print(f"\n{pieces[-1]}")
+            response = "".join(pieces)
         logging.info(f"User prompt: '{prompt}' | Response: '{response[:100]}...'")
 
 if __name__ == "__main__":
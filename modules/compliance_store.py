@@ -0,0 +1,512 @@
+# compliance_store.py
+"""Persistent SQLite store for the compliance library.
+
+The library is kept in normalized tables instead of being rebuilt from XML on every start:
+
+    benchmarks          one row per source file (STIG, SRG or CCI list) with its size, mtime and hash
+    rules               STIG/SRG rules, rule_ccis the CCIs each rule cites (in order)
+    ccis                CCIs, with cci_references and cci_controls (the NIST controls they reference)
+    nist_controls       controls of the ATT&CK mapping, control_techniques their techniques (in order)
+    techniques          the ATT&CK technique table; idx is the index records use for technique_ids
+    acronyms            the acronym map
+    rules_fts/ccis_fts  FTS5 indexes over rule titles and descriptions and CCI definitions
+
+update_store() brings the store up to date with the library on disk, re-parsing only files
+whose contents changed. StoreCorpus answers the same lookups as ComplianceCorpus with
+indexed queries, so opening the store replaces parsing the library.
+"""
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+import weakref
+from array import array
+from functools import lru_cache
+from urllib.request import pathname2url
+from compliance_corpus import Rule, CCI, Reference, Technique
+from xccdf_parser import list_source_files, parse_source_files
+from attack_mapping import attack_mapping_file, load_attack_mapping, nist_control
+from parse_cache import hash_file
+from search_index import MARKUP_RE, tokenize
+from pdf_parser import load_acronym_mapping
+
+# Bump when the schema changes; an older store is rebuilt from scratch
+STORE_VERSION = 2
+DEFAULT_STORE_FILE = os.path.join("data", "compliance.sqlite3")
+RECORD_CACHE_SIZE = 4096
+TITLE_WEIGHT = 2.0  # bm25() weight of a rule title relative to its description
+BATCH_SIZE = 500  # Rows per IN (...) list when materializing records in bulk
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS benchmarks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    file TEXT NOT NULL,
+    type TEXT,
+    load_order INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rules (
+    rowid INTEGER PRIMARY KEY,
+    benchmark INTEGER NOT NULL REFERENCES benchmarks (id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    type TEXT,
+    title TEXT,
+    description TEXT,
+    severity TEXT,
+    srg TEXT,
+    current INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS rules_id ON rules (id, current);
+CREATE INDEX IF NOT EXISTS rules_benchmark ON rules (benchmark);
+CREATE TABLE IF NOT EXISTS rule_ccis (
+    rule INTEGER NOT NULL REFERENCES rules (rowid) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    cci_id TEXT NOT NULL,
+    PRIMARY KEY (rule, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rule_ccis_cci ON rule_ccis (cci_id);
+CREATE TABLE IF NOT EXISTS ccis (
+    rowid INTEGER PRIMARY KEY,
+    benchmark INTEGER NOT NULL REFERENCES benchmarks (id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    definition TEXT,
+    cci_type TEXT,
+    status TEXT,
+    publishdate TEXT,
+    contributor TEXT,
+    current INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ccis_id ON ccis (id, current);
+CREATE INDEX IF NOT EXISTS ccis_benchmark ON ccis (benchmark);
+CREATE TABLE IF NOT EXISTS cci_references (
+    cci INTEGER NOT NULL REFERENCES ccis (rowid) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    creator TEXT,
+    title TEXT,
+    version TEXT,
+    location TEXT,
+    "index" TEXT,
+    PRIMARY KEY (cci, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cci_controls (
+    cci INTEGER NOT NULL REFERENCES ccis (rowid) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    control_id TEXT NOT NULL,
+    PRIMARY KEY (cci, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cci_controls_control ON cci_controls (control_id);
+CREATE TABLE IF NOT EXISTS nist_controls (id TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS techniques (
+    idx INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS control_techniques (
+    control_id TEXT NOT NULL REFERENCES nist_controls (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    technique INTEGER NOT NULL REFERENCES techniques (idx),
+    PRIMARY KEY (control_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS control_techniques_technique ON control_techniques (technique);
+CREATE TABLE IF NOT EXISTS acronyms (acronym TEXT PRIMARY KEY, meaning TEXT) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS rules_fts USING fts5 (title, description, tokenize = 'porter unicode61');
+CREATE VIRTUAL TABLE IF NOT EXISTS ccis_fts USING fts5 (definition, tokenize = 'porter unicode61');
+"""
+
+def store_path(config, base_path=None):
+    """Return the store's path from config, relative to the repository root."""
+    base_path = base_path or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, config.get("compliance_store_file") or DEFAULT_STORE_FILE)
+
+def _search_text(text):
+    """Return text with embedded XCCDF markup removed, as stored in the FTS indexes."""
+    return MARKUP_RE.sub(" ", text or "")
+
+def _connect(path, timeout=600):
+    db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA foreign_keys = ON")
+    return db
+
+def _meta(db, key):
+    row = db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def _delete_benchmark(db, benchmark_id):
+    """Delete a source file's records and their FTS rows; dependent rows go by ON DELETE CASCADE."""
+    db.execute("DELETE FROM rules_fts WHERE rowid IN (SELECT rowid FROM rules WHERE benchmark = ?)", (benchmark_id,))
+    db.execute("DELETE FROM ccis_fts WHERE rowid IN (SELECT rowid FROM ccis WHERE benchmark = ?)", (benchmark_id,))
+    db.execute("DELETE FROM benchmarks WHERE id = ?", (benchmark_id,))
+
+def _insert_records(db, benchmark_id, records):
+    for record in records.values():
+        if isinstance(record, Rule):
+            rowid = db.execute(
+                "INSERT INTO rules (benchmark, id, type, title, description, severity, srg) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (benchmark_id, record.id, record.type, record.title or "No title",
+                 record.description or "No description", record.severity, record.srg)
+            ).lastrowid
+            db.executemany("INSERT INTO rule_ccis VALUES (?, ?, ?)", [(rowid, position, cci) for position, cci in enumerate(record.ccis)])
+            db.execute("INSERT INTO rules_fts (rowid, title, description) VALUES (?, ?, ?)",
+                       (rowid, _search_text(record.title), _search_text(record.description)))
+        else:
+            rowid = db.execute(
+                "INSERT INTO ccis (benchmark, id, definition, cci_type, status, publishdate, contributor) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (benchmark_id, record.id, record.definition, record.cci_type, record.status, record.publishdate, record.contributor)
+            ).lastrowid
+            db.executemany("INSERT INTO cci_references VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                (rowid, position, ref.creator, ref.title, ref.version, ref.location, ref.index)
+                for position, ref in enumerate(record.references)
+            ])
+            controls = dict.fromkeys(control for control in map(nist_control, record.references) if control)
+            db.executemany("INSERT INTO cci_controls VALUES (?, ?, ?)", [(rowid, position, control) for position, control in enumerate(controls)])
+            db.execute("INSERT INTO ccis_fts (rowid, definition) VALUES (?, ?)", (rowid, _search_text(record.definition)))
+
+def _replace_mapping(db, controls):
+    """Replace the NIST control and ATT&CK technique tables with a freshly loaded mapping.
+
+    Technique indexes are assigned in order of first appearance, as ComplianceCorpus does.
+    """
+    db.execute("DELETE FROM control_techniques")
+    db.execute("DELETE FROM nist_controls")
+    db.execute("DELETE FROM techniques")
+    technique_index = {}
+    for control_id, techniques in controls.items():
+        db.execute("INSERT INTO nist_controls VALUES (?)", (control_id,))
+        for position, tech in enumerate(techniques):
+            index = technique_index.get(tech["id"])
+            if index is None:
+                index = technique_index[tech["id"]] = len(technique_index)
+                db.execute("INSERT INTO techniques VALUES (?, ?, ?, ?)", (index, tech["id"], tech["name"], tech.get("description", "")))
+            db.execute("INSERT INTO control_techniques VALUES (?, ?, ?)", (control_id, position, index))
+
+def _mark_current(db):
+    """Flag the record that wins for each id: the one from the source file loaded last."""
+    for table in ("rules", "ccis"):
+        db.execute(f"""
+            UPDATE {table} SET current = (rowid = (
+                SELECT other.rowid FROM {table} AS other JOIN benchmarks ON benchmarks.id = other.benchmark
+                WHERE other.id = {table}.id ORDER BY benchmarks.load_order DESC LIMIT 1
+            ))
+        """)
+
+def update_store(config, base_path=None, rebuild=False):
+    """Bring the compliance store up to date with the STIG, SRG and CCI files on disk.
+
+    A file is re-parsed only when its size or mtime changed and its content hash no longer
+    matches; files that disappeared are deleted with their records. The ATT&CK tables are
+    reloaded when the mapping file changes. The whole update is one transaction, so readers
+    see either the old library or the new one. rebuild=True re-parses every file.
+
+    Returns:
+        dict: Names of 'added', 'changed' and 'removed' files, and the 'unchanged' count.
+    """
+    start_time = time.perf_counter()
+    base_path = base_path or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = store_path(config, base_path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = _connect(path)
+    try:
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        # Take the write lock before comparing, so concurrent updaters parse each change once
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            has_meta = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'meta'").fetchone()
+            if rebuild or (has_meta and _meta(db, "store_version") != str(STORE_VERSION)):
+                logging.info(f"Rebuilding compliance store {path} from scratch.")
+                tables = db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE %TABLE%'").fetchall()
+                for name, in tables:
+                    if not name.startswith(("rules_fts_", "ccis_fts_")):
+                        db.execute(f'DROP TABLE IF EXISTS "{name}"')
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    db.execute(statement)
+
+            source_files = list_source_files(config, base_path)
+            known = {row[1]: row for row in db.execute("SELECT id, path, size, mtime_ns, sha256 FROM benchmarks")}
+            report = {"added": [], "changed": [], "removed": [], "unchanged": 0}
+            pending = []
+            hashes = []
+            for load_order, (xml_file, item_type) in enumerate(source_files):
+                rel_path = os.path.relpath(xml_file, base_path)
+                stat = os.stat(xml_file)
+                row = known.pop(rel_path, None)
+                sha256 = None
+                if row is not None and row[2] == stat.st_size:
+                    if row[3] == stat.st_mtime_ns:
+                        sha256 = row[4]
+                    elif row[4] == hash_file(xml_file):
+                        sha256 = row[4]
+                        db.execute("UPDATE benchmarks SET mtime_ns = ? WHERE id = ?", (stat.st_mtime_ns, row[0]))
+                if sha256 is None:
+                    pending.append((xml_file, item_type, rel_path, load_order, row))
+                else:
+                    db.execute("UPDATE benchmarks SET load_order = ? WHERE id = ?", (load_order, row[0]))
+                    report["unchanged"] += 1
+                hashes.append((rel_path, sha256))
+
+            for rel_path, row in known.items():
+                _delete_benchmark(db, row[0])
+                report["removed"].append(os.path.basename(rel_path))
+
+            parsed = parse_source_files([(xml_file, item_type) for xml_file, item_type, *_ in pending], config)
+            new_hashes = {}
+            for (xml_file, item_type, rel_path, load_order, row), (records, sha256, error) in zip(pending, parsed):
+                if error:
+                    logging.error(f"Failed to parse {item_type} file {xml_file}: {error}")
+                    continue
+                if row is not None:
+                    _delete_benchmark(db, row[0])
+                stat = os.stat(xml_file)
+                benchmark_id = db.execute(
+                    "INSERT INTO benchmarks (path, file, type, load_order, size, mtime_ns, sha256) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (rel_path, os.path.basename(xml_file), item_type, load_order, stat.st_size, stat.st_mtime_ns, sha256)
+                ).lastrowid
+                _insert_records(db, benchmark_id, records)
+                new_hashes[rel_path] = sha256
+                report["changed" if row is not None else "added"].append(os.path.basename(xml_file))
+                logging.info(f"Stored {item_type} file {xml_file} with {len(records)} items")
+            if pending or report["removed"]:
+                _mark_current(db)
+
+            framework, mapping_file = attack_mapping_file(config, base_path)
+            mapping_hash = hash_file(mapping_file) if os.path.exists(mapping_file) else ""
+            if _meta(db, "mapping") != f"{framework}:{mapping_hash}":
+                _replace_mapping(db, load_attack_mapping(framework, mapping_file))
+
+            acronym_map = load_acronym_mapping(workers=config.get("ingest_workers", 0))
+            acronym_hash = hashlib.sha256(repr(sorted(acronym_map.items())).encode()).hexdigest()
+            if _meta(db, "acronyms") != acronym_hash:
+                db.execute("DELETE FROM acronyms")
+                db.executemany("INSERT INTO acronyms VALUES (?, ?)", acronym_map.items())
+
+            digest = hashlib.sha256(f"store-v{STORE_VERSION}\n".encode())
+            for rel_path, sha256 in hashes:
+                sha256 = sha256 or new_hashes.get(rel_path)
+                if sha256:
+                    digest.update(f"{os.path.basename(rel_path)}:{sha256}\n".encode())
+            digest.update(f"{framework}\n{mapping_hash}\n".encode())
+            db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("store_version", str(STORE_VERSION)),
+                ("version", digest.hexdigest()[:16]),
+                ("mapping", f"{framework}:{mapping_hash}"),
+                ("acronyms", acronym_hash),
+                ("updated", str(time.time()))
+            ])
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if pending or report["removed"]:
+            db.execute("PRAGMA optimize")
+    finally:
+        db.close()
+    logging.info(
+        f"Updated compliance store {path} in {time.perf_counter() - start_time:.2f}s: "
+        f"{len(report['added'])} added, {len(report['changed'])} changed, "
+        f"{len(report['removed'])} removed, {report['unchanged']} unchanged"
+    )
+    return report
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching any of its search terms, or None if it has none."""
+    terms = dict.fromkeys(tokenize(text))
+    return " OR ".join(f'"{term}"' for term in terms) or None
+
+class StoreSearch:
+    """BM25 search over the store's FTS5 indexes, with the same interface as SearchIndex."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def search(self, query, k=10):
+        """Return (total_matches, [(item_id, score), ...]) for the top k rules and CCIs."""
+        match = fts_query(query)
+        if match is None:
+            return 0, []
+        with self.store.lock:
+            db = self.store.db
+            total = db.execute("""
+                SELECT (SELECT count(*) FROM rules_fts JOIN rules ON rules.rowid = rules_fts.rowid
+                        WHERE rules_fts MATCH ?1 AND rules.current)
+                     + (SELECT count(*) FROM ccis_fts JOIN ccis ON ccis.rowid = ccis_fts.rowid
+                        WHERE ccis_fts MATCH ?1 AND ccis.current)
+            """, (match,)).fetchone()[0]
+            hits = db.execute("""
+                SELECT id, score FROM (
+                    SELECT rules.id AS id, -bm25(rules_fts, ?2, 1.0) AS score
+                    FROM rules_fts JOIN rules ON rules.rowid = rules_fts.rowid
+                    WHERE rules_fts MATCH ?1 AND rules.current
+                    UNION ALL
+                    SELECT ccis.id, -bm25(ccis_fts)
+                    FROM ccis_fts JOIN ccis ON ccis.rowid = ccis_fts.rowid
+                    WHERE ccis_fts MATCH ?1 AND ccis.current
+                ) ORDER BY score DESC, id LIMIT ?3
+            """, (match, TITLE_WEIGHT, k)).fetchall()
+        return total, hits
+
+class StoreCorpus:
+    """Read-only view of the compliance store with the lookup interface of ComplianceCorpus.
+
+    Records are built from the store on demand and the most recently used are cached. The
+    view holds one read transaction open for its lifetime, so it keeps seeing the library as
+    it was when opened even while update_store() commits changes: like an in-memory corpus,
+    it is an immutable snapshot, and CorpusSnapshots swaps in a new view after a refresh.
+    Queries from several threads share the connection under a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(
+            f"file:{pathname2url(path)}?mode=ro", uri=True, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("BEGIN")
+        self.version = _meta(self.db, "version")
+        self.techniques = [Technique(*row) for row in self.db.execute("SELECT id, name, description FROM techniques ORDER BY idx")]
+        self.technique_index = {tech.id: index for index, tech in enumerate(self.techniques)}
+        self.acronym_map = dict(self.db.execute("SELECT acronym, meaning FROM acronyms"))
+        self.acronym_expander = None
+        # Weak references, so no cycle keeps a dropped view (and its read transaction) alive
+        self.search_index = StoreSearch(weakref.proxy(self))
+        self.vector_index = None
+        self.response_cache = None
+        self.crosswalk = None
+        self.coverage = None
+        self._size = self.db.execute(
+            "SELECT (SELECT count(*) FROM rules WHERE current) + (SELECT count(*) FROM ccis WHERE current)"
+        ).fetchone()[0]
+        fetch = weakref.WeakMethod(self._fetch)
+        self._get = lru_cache(maxsize=RECORD_CACHE_SIZE)(lambda item_id: fetch()(item_id))
+
+    def close(self):
+        """End the read transaction and close the connection and the LLM response cache."""
+        if self.response_cache is not None:
+            self.response_cache.close()
+        with self.lock:
+            self.db.close()
+
+    def __del__(self):
+        try:
+            self.db.close()
+        except Exception:
+            pass
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, item_id):
+        return self._get(item_id) is not None
+
+    def __getitem__(self, item_id):
+        record = self._get(item_id)
+        if record is None:
+            raise KeyError(item_id)
+        return record
+
+    def get(self, item_id, default=None):
+        record = self._get(item_id)
+        return default if record is None else record
+
+    def _fetch(self, item_id):
+        with self.lock:
+            ccis = self._ccis("WHERE ccis.id = ? AND ccis.current", (item_id,))
+            if ccis:
+                return ccis[0]
+            rules = self._rules("WHERE rules.id = ? AND rules.current", (item_id,))
+            return rules[0] if rules else None
+
+    def _grouped(self, sql, rowids):
+        """Run sql (with one IN (...) placeholder list) over rowids in batches; return {rowid: [values]}."""
+        grouped = {}
+        for start in range(0, len(rowids), BATCH_SIZE):
+            batch = rowids[start:start + BATCH_SIZE]
+            for rowid, *values in self.db.execute(sql.format(",".join("?" * len(batch))), batch):
+                grouped.setdefault(rowid, []).append(values[0] if len(values) == 1 else values)
+        return grouped
+
+    def _rules(self, where, params=()):
+        rows = self.db.execute(f"""
+            SELECT rules.rowid, rules.id, rules.type, rules.title, rules.description, rules.severity, benchmarks.file, rules.srg
+            FROM rules JOIN benchmarks ON benchmarks.id = rules.benchmark {where}
+        """, params).fetchall()
+        rowids = [row[0] for row in rows]
+        ccis = self._grouped("SELECT rule, cci_id FROM rule_ccis WHERE rule IN ({}) ORDER BY rule, position", rowids)
+        techniques = self._grouped("""
+            SELECT rule_ccis.rule, control_techniques.technique FROM rule_ccis
+            JOIN ccis ON ccis.id = rule_ccis.cci_id AND ccis.current
+            JOIN cci_controls ON cci_controls.cci = ccis.rowid
+            JOIN control_techniques ON control_techniques.control_id = cci_controls.control_id
+            WHERE rule_ccis.rule IN ({})
+            ORDER BY rule_ccis.rule, rule_ccis.position, cci_controls.position, control_techniques.position
+        """, rowids)
+        records = []
+        for rowid, item_id, item_type, title, description, severity, file, srg in rows:
+            rule = Rule(item_id, item_type, title, description, severity, file, tuple(ccis.get(rowid, ())), srg)
+            rule.technique_ids = array('I', dict.fromkeys(techniques.get(rowid, ())))
+            records.append(rule)
+        return records
+
+    def _ccis(self, where, params=()):
+        rows = self.db.execute(f"""
+            SELECT ccis.rowid, ccis.id, ccis.definition, ccis.cci_type, ccis.status, ccis.publishdate, ccis.contributor, benchmarks.file
+            FROM ccis JOIN benchmarks ON benchmarks.id = ccis.benchmark {where}
+        """, params).fetchall()
+        rowids = [row[0] for row in rows]
+        references = self._grouped("""
+            SELECT cci, creator, title, version, location, "index" FROM cci_references
+            WHERE cci IN ({}) ORDER BY cci, position
+        """, rowids)
+        techniques = self._grouped("""
+            SELECT cci_controls.cci, control_techniques.technique FROM cci_controls
+            JOIN control_techniques ON control_techniques.control_id = cci_controls.control_id
+            WHERE cci_controls.cci IN ({}) ORDER BY cci_controls.cci, cci_controls.position, control_techniques.position
+        """, rowids)
+        records = []
+        for rowid, item_id, definition, cci_type, status, publishdate, contributor, file in rows:
+            cci = CCI(item_id, definition, cci_type, status, publishdate, contributor,
+                      tuple(Reference(*ref) for ref in references.get(rowid, ())), file)
+            cci.technique_ids = array('I', dict.fromkeys(techniques.get(rowid, ())))
+            records.append(cci)
+        return records
+
+    def techniques_for(self, record):
+        """Return the Technique objects referenced by a Rule or CCI."""
+        return [self.techniques[index] for index in record.technique_ids]
+
+    def rules(self):
+        """Return all current STIG and SRG rules (built from the store on each call)."""
+        with self.lock:
+            return iter(self._rules("WHERE rules.current ORDER BY rules.rowid"))
+
+    def ccis(self):
+        """Return all current CCIs (built from the store on each call)."""
+        with self.lock:
+            return iter(self._ccis("WHERE ccis.current ORDER BY ccis.rowid"))
+
+    def rules_citing(self, cci_id):
+        """Return the rules that cite a CCI."""
+        with self.lock:
+            return self._rules(
+                "WHERE rules.current AND rules.rowid IN (SELECT rule FROM rule_ccis WHERE cci_id = ?) ORDER BY rules.rowid",
+                (cci_id,)
+            )
+
+    @property
+    def items(self):
+        """Every current record by id; builds them all, so meant for one-off index builds."""
+        items = {rule.id: rule for rule in self.rules()}
+        items.update((cci.id, cci) for cci in self.ccis())
+        return items
+
+def load_store_corpus(config, base_path=None, rebuild=False):
+    """Update the compliance store (a no-op stat of each file when nothing changed) and open it as a StoreCorpus."""
+    update_store(config, base_path, rebuild=rebuild)
+    return StoreCorpus(store_path(config, base_path))
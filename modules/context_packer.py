@@ -0,0 +1,187 @@
+# context_packer.py
+import re
+from compliance_corpus import Rule
+
+TOKEN_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+VULN_DISCUSSION_RE = re.compile(r"<VulnDiscussion>(.*?)</VulnDiscussion>", re.DOTALL)
+MARKUP_RE = re.compile(r"<[^>]+>")
+SEVERITY_RANK = {"high": 0, "medium": 1, "low": 2}
+DEFAULT_TOKEN_BUDGET = 1500
+SEARCH_CANDIDATES = 20  # Ranked search hits offered to the packer; the budget decides how many are kept
+
+def estimate_tokens(text):
+    """Approximate a BPE token count: words cost one token per four characters, punctuation one each.
+
+    Errs slightly high for English prose, so packing to the estimate stays within a real budget.
+    """
+    return sum((len(piece) + 3) // 4 for piece in TOKEN_PIECE_RE.findall(text))
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text at a word boundary so it fits in about max_tokens, marking the cut with '...'."""
+    used = 0
+    for match in TOKEN_PIECE_RE.finditer(text):
+        used += (len(match.group()) + 3) // 4
+        if used > max_tokens - 1:
+            return text[:match.start()].rstrip() + "..."
+    return text
+
+def clean_description(text):
+    """Reduce an XCCDF rule description to its readable discussion, without the empty markup fields."""
+    match = VULN_DISCUSSION_RE.search(text or "")
+    text = match.group(1) if match else text or ""
+    return " ".join(MARKUP_RE.sub(" ", text).split())
+
+class ContextPacker:
+    """Accumulates context lines until an approximate token budget is spent."""
+
+    def __init__(self, budget=DEFAULT_TOKEN_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self.lines = []
+
+    @property
+    def remaining(self):
+        return self.budget - self.used
+
+    def add(self, line, required=False):
+        """Append a line if it fits (or unconditionally if required); return whether it was added."""
+        cost = estimate_tokens(line) + 1
+        if not required and cost > self.remaining:
+            return False
+        self.lines.append(line)
+        self.used += cost
+        return True
+
+    def add_truncated(self, prefix, text, max_tokens=None):
+        """Append prefix + text, truncating text to the smaller of max_tokens and the remaining budget."""
+        room = self.remaining - estimate_tokens(prefix) - 1
+        if max_tokens is not None:
+            room = min(room, max_tokens)
+        if room < 8:
+            return False
+        return self.add(prefix + truncate_to_tokens(text, room))
+
+    def render(self):
+        return "\n".join(self.lines) + "\n"
+
+def _technique_lines(corpus, technique_ids):
+    """ATT&CK technique lines, most frequently referenced first."""
+    counts = {}
+    for index in technique_ids:
+        counts[index] = counts.get(index, 0) + 1
+    for index in sorted(counts, key=lambda index: (-counts[index], corpus.techniques[index].id)):
+        technique = corpus.techniques[index]
+        yield f"  - {technique.id}: {technique.name} - {truncate_to_tokens(technique.description, 30)}"
+
+def _pack_techniques(packer, corpus, technique_ids):
+    """Add as many ranked technique lines as fit and note how many were left out."""
+    lines = list(_technique_lines(corpus, technique_ids))
+    if not lines or not packer.add("Mitigated ATT&CK Techniques:"):
+        return
+    added = 0
+    for line in lines:
+        if not packer.add(line):
+            break
+        added += 1
+    if added < len(lines):
+        packer.add(f"  ({len(lines) - added} more techniques omitted)", required=True)
+
+def pack_rule(packer, corpus, rule):
+    """Pack a STIG/SRG rule: its header, discussion, the CCIs it implements, then its ATT&CK techniques."""
+    packer.add(f"Control ID: {rule.id}", required=True)
+    packer.add(f"Type: {rule.type}", required=True)
+    packer.add(f"Title: {rule.title}", required=True)
+    packer.add(f"Severity: {rule.severity}", required=True)
+    packer.add(f"Source File: {rule.file}", required=True)
+    # The discussion may take up to half of what is left; CCIs and techniques share the rest
+    packer.add_truncated("Description: ", clean_description(rule.description), packer.remaining // 2)
+    if rule.ccis:
+        packer.add(f"CCIs: {', '.join(rule.ccis)}")
+        for cci_id in rule.ccis:
+            cci = corpus.get(cci_id)
+            if cci is not None:
+                refs = ", ".join(f"{ref.title} {ref.index}".strip() for ref in cci.references)
+                packer.add_truncated(f"  - {cci_id}: ", f"{cci.definition} [{refs or 'no references'}]", 80)
+    technique_ids = [index for cci_id in rule.ccis if cci_id in corpus for index in corpus[cci_id].technique_ids]
+    _pack_techniques(packer, corpus, technique_ids or rule.technique_ids)
+
+def pack_cci(packer, corpus, cci):
+    """Pack a CCI: its header and definition, then its ATT&CK techniques, then rules that implement it."""
+    ref_titles = [f"{ref.title} {ref.index}".strip() for ref in cci.references] or ["None"]
+    packer.add(f"CCI ID: {cci.id}", required=True)
+    packer.add(f"Type: {cci.type}", required=True)
+    packer.add_truncated("Definition: ", cci.definition, max(packer.remaining // 2, 8))
+    packer.add(f"CCI Type: {cci.cci_type}")
+    packer.add(f"Status: {cci.status}")
+    packer.add(f"Publish Date: {cci.publishdate}")
+    packer.add(f"Contributor: {cci.contributor}")
+    packer.add(f"References: {', '.join(ref_titles)}")
+    _pack_techniques(packer, corpus, cci.technique_ids)
+    rules = sorted(corpus.rules_citing(cci.id), key=lambda rule: (rule.type != "SRG", SEVERITY_RANK.get(rule.severity, 3), rule.id))
+    if rules and packer.remaining > 40:
+        packer.add(f"Implementing rules ({len(rules)}), SRGs first:")
+        pack_hits(packer, corpus, [(rule.id, None) for rule in rules])
+
+CROSSWALK_LABELS = {"srg": "SRG Requirement", "control": "NIST SP 800-53 Control", "cci": "CCI"}
+
+def pack_crosswalk(packer, corpus, name):
+    """Pack an ATT&CK technique, NIST control or SRG requirement from the crosswalk graph:
+    the SRG requirements, controls and CCIs it links to, its ATT&CK techniques, then the rules
+    that implement it."""
+    graph = corpus.crosswalk
+    kind, indexes = graph.find(name)
+    if len(indexes) == 1:
+        name = graph.names[kind][indexes[0]]
+    _, related = graph.crosswalk(name)
+    if kind == "technique" and name in corpus.technique_index:
+        technique = corpus.techniques[corpus.technique_index[name]]
+        packer.add(f"ATT&CK Technique: {technique.id}: {technique.name}", required=True)
+        packer.add_truncated("Description: ", technique.description, 60)
+    else:
+        packer.add(f"{CROSSWALK_LABELS[kind]}: {name}", required=True)
+    for other, label in CROSSWALK_LABELS.items():
+        if related.get(other):
+            packer.add_truncated(f"{label}s ({len(related[other])}): ", ", ".join(related[other]), 80)
+    if kind != "technique":
+        _pack_techniques(packer, corpus, [corpus.technique_index[tech_id] for tech_id in related["technique"] if tech_id in corpus.technique_index])
+    rules = sorted(
+        (corpus[rule_id] for rule_id in related.get("rule", ()) if rule_id in corpus),
+        key=lambda rule: (rule.type != "SRG", SEVERITY_RANK.get(rule.severity, 3), rule.id)
+    )
+    if rules and packer.remaining > 40:
+        packer.add(f"Implementing rules ({len(rules)}), SRGs first:")
+        pack_hits(packer, corpus, [(rule.id, None) for rule in rules])
+
+def pack_hits(packer, corpus, hits, similarity=False, excerpt_tokens=40):
+    """Pack ranked (item_id, score) hits as one line each, until the budget runs out.
+
+    With similarity set, scores are cosine similarities and are shown next to each line.
+
+    STIGs routinely copy their SRG's requirement text verbatim, so hits with the same title
+    and description collapse into one line listing all their ids, and a discussion excerpt
+    already shown for an earlier hit is not repeated.
+    """
+    groups = {}
+    for item_id, score in hits:
+        item = corpus[item_id]
+        text = (item.title, item.description) if isinstance(item, Rule) else (item.definition,)
+        groups.setdefault(text, []).append((item, score))
+    shown = 0
+    seen_excerpts = set()
+    for group in groups.values():
+        item, score = group[0]
+        ids = ", ".join(member.id for member, _ in group)
+        label = f"{item.type}, similarity {score:.2f}" if similarity else item.type
+        if isinstance(item, Rule):
+            line = f"- {ids} ({label}): {item.title}"
+            excerpt = truncate_to_tokens(clean_description(item.description), excerpt_tokens)
+            if excerpt and excerpt != item.title and excerpt not in seen_excerpts:
+                seen_excerpts.add(excerpt)
+                line += f" - {excerpt}"
+        else:
+            line = f"- {ids} ({label}): {truncate_to_tokens(item.definition, excerpt_tokens)}"
+        if not packer.add(line):
+            break
+        shown += 1
+    if shown < len(groups):
+        packer.add(f"({len(groups) - shown} more distinct results omitted)", required=True)
@@ -0,0 +1,384 @@
+# corpus_image.py
+"""Immutable, memory-mapped binary image of a loaded compliance corpus.
+
+Every process that loads the library used to hold its own copy of every record. A corpus
+image is written once per change of the library and then mapped read-only by each process,
+so they all share one set of physical pages (the OS page cache) and opening it takes
+milliseconds. Records are decoded only when they are looked up.
+
+Layout: an 8-byte magic, the length of a JSON header, the header, then 8-byte-aligned
+sections listed in the header as {name: [offset, dtype, count]}:
+
+    heap, string_offsets    every distinct string once, as UTF-8; string id s is
+                            heap[string_offsets[s]:string_offsets[s + 1]]
+    rules, ccis             fixed-width rows of string ids, sorted by item id
+    techniques, acronyms    rows of string ids
+    rule_cci                CSR lists (each with a <name>_offsets array): the CCIs each rule
+    rule_technique          cites, the ATT&CK technique indexes of each rule and each CCI,
+    cci_technique           each CCI's references as runs of 5 string ids, and the rows
+    cci_reference           of the rules citing each CCI
+    cci_citing
+    search_*                the BM25 search index: sorted terms and their postings spans,
+                            postings, weights and document ids
+"""
+import os
+import json
+import mmap
+import glob
+import struct
+import weakref
+import hashlib
+import logging
+import tempfile
+import numpy as np
+from bisect import bisect_left
+from array import array
+from functools import lru_cache
+from compliance_corpus import Rule, CCI, Reference, Technique
+from search_index import SearchIndex
+from xccdf_parser import list_source_files
+from attack_mapping import attack_mapping_file
+
+MAGIC = b"CCIMG001"
+FORMAT_VERSION = 2
+DEFAULT_IMAGE_FILE = os.path.join("data", "cache", "corpus.img")
+RECORD_CACHE_SIZE = 4096
+RULE_COLUMNS = ("id", "type", "title", "description", "severity", "file", "srg")
+CCI_COLUMNS = ("id", "definition", "cci_type", "status", "publishdate", "contributor", "file")
+
+def image_path(config, base_path):
+    """Return the corpus image path from config, relative to the repository root."""
+    return os.path.join(base_path, config.get("corpus_image_file") or DEFAULT_IMAGE_FILE)
+
+def source_stamp(config, base_path):
+    """Return a digest of the name, size and mtime of every file a corpus is loaded from.
+
+    Only stat() calls are needed, so a process can tell in a few milliseconds whether an
+    existing image still matches the library on disk.
+    """
+    framework, mapping_file = attack_mapping_file(config, base_path)
+    paths = [xml_file for xml_file, _ in list_source_files(config, base_path)]
+    paths.append(mapping_file)
+    paths.extend(sorted(glob.glob(os.path.join(base_path, "data", "docs", "_STIG_Acronym_List_*.pdf"))))
+    digest = hashlib.sha256(f"image-v{FORMAT_VERSION}\n{framework}\n".encode())
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, base_path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        except OSError:
+            digest.update(f"{os.path.relpath(path, base_path)}:missing\n".encode())
+    return digest.hexdigest()[:16]
+
+class _ImageWriter:
+    """Collects sections and deduplicated strings, then writes them out as an image."""
+
+    def __init__(self):
+        self.strings = {}
+        self.heap = bytearray()
+        self.string_offsets = array('Q', [0])
+        self.sections = {}
+
+    def string(self, text):
+        """Return the string id of text, adding it to the heap on first sight."""
+        text = text if text is not None else ""
+        sid = self.strings.get(text)
+        if sid is None:
+            sid = self.strings[text] = len(self.strings)
+            self.heap += text.encode("utf-8", "surrogatepass")
+            self.string_offsets.append(len(self.heap))
+        return sid
+
+    def csr(self, name, lists):
+        """Add the lists as <name>_offsets (count + 1 entries) and one flat <name> array."""
+        offsets = np.zeros(len(lists) + 1, dtype=np.uint32)
+        offsets[1:] = np.cumsum([len(values) for values in lists])
+        self.sections[f"{name}_offsets"] = offsets
+        self.sections[name] = np.fromiter((value for values in lists for value in values), dtype=np.uint32, count=int(offsets[-1]))
+
+    def write(self, path, header):
+        self.sections["heap"] = np.frombuffer(bytes(self.heap), dtype=np.uint8)
+        self.sections["string_offsets"] = np.frombuffer(self.string_offsets, dtype=np.uint64)
+        # Lay the sections out after a header whose size depends on their offsets: reserve
+        # room for the header by sizing it with placeholder offsets first
+        layout = {name: [0, data.dtype.str, int(data.size)] for name, data in self.sections.items()}
+        header = dict(header, sections=layout)
+        start = _align(len(MAGIC) + 8 + len(json.dumps(header)) + 32 * len(layout))
+        offset = start
+        for name, data in self.sections.items():
+            layout[name][0] = offset
+            offset = _align(offset + data.nbytes)
+        encoded = json.dumps(header).encode()
+        if len(MAGIC) + 8 + len(encoded) > start:
+            raise ValueError("Corpus image header outgrew its reserved space")
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory or ".", exist_ok=True)
+        temp_file = tempfile.NamedTemporaryFile(delete=False, dir=directory or None, suffix=".tmp")
+        try:
+            temp_file.write(MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+            for name, data in self.sections.items():
+                temp_file.seek(layout[name][0])
+                temp_file.write(data.tobytes())
+            temp_file.truncate(offset)
+            temp_file.close()
+            # Processes that mapped the previous image keep reading it until they reopen
+            os.replace(temp_file.name, path)
+        except BaseException:
+            temp_file.close()
+            os.unlink(temp_file.name)
+            raise
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+def write_corpus_image(corpus, path, stamp):
+    """Write a loaded ComplianceCorpus (and its search index, if it has one) as an image at path."""
+    writer = _ImageWriter()
+    string = writer.string
+    rules = sorted(corpus.rules(), key=lambda rule: rule.id)
+    ccis = sorted(corpus.ccis(), key=lambda cci: cci.id)
+    rule_rows = {rule.id: row for row, rule in enumerate(rules)}
+
+    writer.sections["rules"] = np.array(
+        [[string(getattr(rule, column)) for column in RULE_COLUMNS] for rule in rules], dtype=np.uint32
+    ).reshape(-1, len(RULE_COLUMNS))
+    writer.csr("rule_cci", [[string(cci_id) for cci_id in rule.ccis] for rule in rules])
+    writer.csr("rule_technique", [rule.technique_ids for rule in rules])
+
+    writer.sections["ccis"] = np.array(
+        [[string(getattr(cci, column)) for column in CCI_COLUMNS] for cci in ccis], dtype=np.uint32
+    ).reshape(-1, len(CCI_COLUMNS))
+    writer.csr("cci_reference", [
+        [string(field) for ref in cci.references for field in (ref.creator, ref.title, ref.version, ref.location, ref.index)]
+        for cci in ccis
+    ])
+    writer.csr("cci_technique", [cci.technique_ids for cci in ccis])
+    writer.csr("cci_citing", [[rule_rows[rule.id] for rule in corpus.rules_citing(cci.id)] for cci in ccis])
+
+    writer.sections["techniques"] = np.array(
+        [[string(tech.id), string(tech.name), string(tech.description)] for tech in corpus.techniques], dtype=np.uint32
+    ).reshape(-1, 3)
+    writer.sections["acronyms"] = np.array(
+        [[string(acronym), string(meaning)] for acronym, meaning in corpus.acronym_map.items()], dtype=np.uint32
+    ).reshape(-1, 2)
+
+    index = corpus.search_index
+    has_search = isinstance(index, SearchIndex) and index.version == corpus.version
+    if has_search:
+        terms = sorted(index.terms)
+        writer.sections["search_terms"] = np.array([string(term) for term in terms], dtype=np.uint32)
+        writer.sections["search_spans"] = np.array([index.terms[term] for term in terms], dtype=np.uint32).reshape(-1, 2)
+        writer.sections["search_docs"] = np.asarray(index.docs, dtype=np.int32)
+        writer.sections["search_weights"] = np.asarray(index.weights, dtype=np.float32)
+        writer.sections["search_doc_ids"] = np.array([string(doc_id) for doc_id in index.doc_ids], dtype=np.uint32)
+
+    writer.write(path, {
+        "format": FORMAT_VERSION,
+        "stamp": stamp,
+        "version": corpus.version,
+        "search": has_search
+    })
+    logging.info(f"Wrote corpus image {path} ({os.path.getsize(path) / 1e6:.1f} MB, {len(writer.strings)} distinct strings)")
+
+class _StringColumn:
+    """Read-only sequence decoding a column of string ids on access, e.g. sorted ids for bisect."""
+
+    def __init__(self, image, ids):
+        self.image = image
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        return self.image.string(self.ids[index])
+
+class _MappedTerms:
+    """The term -> (start, stop) postings span lookup of a mapped search index."""
+
+    def __init__(self, image):
+        self.terms = _StringColumn(image, image.column("search_terms"))
+        self.spans = image.column("search_spans")
+
+    def __len__(self):
+        return len(self.terms)
+
+    def get(self, term, default=None):
+        row = bisect_left(self.terms, term)
+        if row < len(self.terms) and self.terms[row] == term:
+            return self.spans[2 * row], self.spans[2 * row + 1]
+        return default
+
+class MappedCorpus:
+    """Read-only view of a corpus image with the lookup interface of ComplianceCorpus.
+
+    Columns are memoryviews over the mapping, so nothing is copied at open; a lookup
+    binary-searches the sorted ids and builds the Rule or CCI from its columns, and the
+    most recently used records are cached.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a corpus image")
+        (header_length,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        self.header = json.loads(self._mm[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+        self._view = memoryview(self._mm)
+        # Weak references, so no cycle keeps a dropped view (and its mapping) alive
+        image = weakref.proxy(self)
+        self._heap = self.column("heap")
+        self._string_offsets = self.column("string_offsets")
+
+        self.version = self.header["version"]
+        self.stamp = self.header["stamp"]
+        self._rules = self.column("rules")
+        self._ccis = self.column("ccis")
+        self._rule_ids = _StringColumn(image, self._rules[::len(RULE_COLUMNS)])
+        self._cci_ids = _StringColumn(image, self._ccis[::len(CCI_COLUMNS)])
+        techniques = self.column("techniques")
+        self.techniques = [Technique(*map(self.string, techniques[row:row + 3])) for row in range(0, len(techniques), 3)]
+        self.technique_index = {tech.id: index for index, tech in enumerate(self.techniques)}
+        acronyms = self.column("acronyms")
+        self.acronym_map = {self.string(acronyms[row]): self.string(acronyms[row + 1]) for row in range(0, len(acronyms), 2)}
+        self.acronym_expander = None
+        self.search_index = self._search_index() if self.header["search"] else None
+        self.vector_index = None
+        self.response_cache = None
+        self.crosswalk = None
+        self.coverage = None
+        fetch = weakref.WeakMethod(self._fetch)
+        self._get = lru_cache(maxsize=RECORD_CACHE_SIZE)(lambda item_id: fetch()(item_id))
+
+    def close(self):
+        """Unmap the image and close the LLM response cache; the view is unusable afterwards."""
+        if self.response_cache is not None:
+            self.response_cache.close()
+        if self._mm is None:
+            return
+        self._get.cache_clear()
+        self.search_index = None
+        self._heap = self._string_offsets = self._rules = self._ccis = self._rule_ids = self._cci_ids = None
+        self._view.release()
+        mm, self._mm = self._mm, None
+        try:
+            mm.close()
+        except BufferError:
+            # An array over the image is still referenced elsewhere; the mapping goes with it
+            pass
+
+    def column(self, name):
+        """Return a section as a zero-copy memoryview of its element type."""
+        offset, dtype, count = self.header["sections"][name]
+        dtype = np.dtype(dtype)
+        return self._view[offset:offset + count * dtype.itemsize].cast(dtype.char)
+
+    def array(self, name):
+        """Return a section as a zero-copy read-only NumPy array."""
+        offset, dtype, count = self.header["sections"][name]
+        return np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+
+    def string(self, sid):
+        return str(self._heap[self._string_offsets[sid]:self._string_offsets[sid + 1]], "utf-8", "surrogatepass")
+
+    def _search_index(self):
+        image = weakref.proxy(self)
+        return SearchIndex(
+            self.version,
+            _StringColumn(image, self.column("search_doc_ids")),
+            _MappedTerms(image),
+            self.array("search_docs"),
+            self.array("search_weights")
+        )
+
+    def _span(self, name, row):
+        offsets = self.column(f"{name}_offsets")
+        return self.column(name)[offsets[row]:offsets[row + 1]]
+
+    def __len__(self):
+        return len(self._rule_ids) + len(self._cci_ids)
+
+    def __contains__(self, item_id):
+        return self._get(item_id) is not None
+
+    def __getitem__(self, item_id):
+        record = self._get(item_id)
+        if record is None:
+            raise KeyError(item_id)
+        return record
+
+    def get(self, item_id, default=None):
+        record = self._get(item_id)
+        return default if record is None else record
+
+    @staticmethod
+    def _find(ids, item_id):
+        row = bisect_left(ids, item_id)
+        return row if row < len(ids) and ids[row] == item_id else None
+
+    def _fetch(self, item_id):
+        row = self._find(self._cci_ids, item_id)
+        if row is not None:
+            return self._cci(row)
+        row = self._find(self._rule_ids, item_id)
+        return self._rule(row) if row is not None else None
+
+    def _rule(self, row):
+        width = len(RULE_COLUMNS)
+        item_id, item_type, title, description, severity, file, srg = map(self.string, self._rules[row * width:(row + 1) * width])
+        rule = Rule(item_id, item_type, title, description, severity, file, tuple(map(self.string, self._span("rule_cci", row))), srg or None)
+        rule.technique_ids = array('I', self._span("rule_technique", row))
+        return rule
+
+    def _cci(self, row):
+        width = len(CCI_COLUMNS)
+        item_id, definition, cci_type, status, publishdate, contributor, file = map(self.string, self._ccis[row * width:(row + 1) * width])
+        fields = list(map(self.string, self._span("cci_reference", row)))
+        references = tuple(Reference(*fields[start:start + 5]) for start in range(0, len(fields), 5))
+        cci = CCI(item_id, definition, cci_type, status, publishdate, contributor, references, file)
+        cci.technique_ids = array('I', self._span("cci_technique", row))
+        return cci
+
+    def techniques_for(self, record):
+        """Return the Technique objects referenced by a Rule or CCI."""
+        return [self.techniques[index] for index in record.technique_ids]
+
+    def rules(self):
+        """Iterate over STIG and SRG rules, decoding each as it is reached."""
+        return (self._rule(row) for row in range(len(self._rule_ids)))
+
+    def ccis(self):
+        """Iterate over CCIs, decoding each as it is reached."""
+        return (self._cci(row) for row in range(len(self._cci_ids)))
+
+    def rules_citing(self, cci_id):
+        """Return the rules that cite a CCI."""
+        row = self._find(self._cci_ids, cci_id)
+        return [self._rule(rule_row) for rule_row in self._span("cci_citing", row)] if row is not None else []
+
+    @property
+    def items(self):
+        """Every record by id; decodes them all, so meant for one-off index builds."""
+        items = {rule.id: rule for rule in self.rules()}
+        items.update((cci.id, cci) for cci in self.ccis())
+        return items
+
+def load_corpus_image(config, base_path, build, rebuild=False):
+    """Map the corpus image if it matches the library on disk; otherwise build(), write a new image and map that.
+
+    build is called with no arguments and must return a loaded ComplianceCorpus.
+    """
+    path = image_path(config, base_path)
+    stamp = source_stamp(config, base_path)
+    if not rebuild and os.path.exists(path):
+        try:
+            corpus = MappedCorpus(path)
+            if corpus.header["format"] == FORMAT_VERSION and corpus.stamp == stamp:
+                logging.info(f"Mapped corpus image {path}")
+                return corpus
+            logging.info("Corpus image is out of date with the library; rebuilding.")
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Failed to read corpus image {path}: {e}. Rebuilding.")
+    write_corpus_image(build(), path, stamp)
+    return MappedCorpus(path)
@@ -0,0 +1,121 @@
+# corpus_snapshots.py
+import os
+import json
+import time
+import logging
+import threading
+from compliance_llm import load_compliance_data, open_response_cache
+
+# Seconds a swapped-out snapshot stays open, so queries already running on it can finish
+RETIRE_DELAY = 60
+
+def read_refresh_marker(marker_file):
+    """Return the 'last_updated' stamp data_fetcher.py writes after a successful refresh, or None."""
+    try:
+        with open(marker_file, 'r') as f:
+            return json.load(f).get("last_updated")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class CorpusSnapshots:
+    """Holds the current compliance corpus and swaps in a rebuilt one after a data refresh.
+
+    A loaded corpus is treated as an immutable snapshot: nothing modifies it after loading.
+    A query should read .current once and use that corpus to the end. A refresh loads a new
+    corpus in the background and then replaces the reference in one assignment, so queries
+    in flight finish on the snapshot they started with and new queries see the new one.
+    Both snapshots are in memory while the new one loads. A replaced snapshot is closed
+    RETIRE_DELAY seconds after the swap, and a rebuild that is not swapped in is closed at
+    once. corpus, if given, is the already loaded initial snapshot.
+    """
+
+    def __init__(self, config, corpus=None, marker_file=None, loader=load_compliance_data):
+        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.config = config
+        self.marker_file = marker_file or os.path.join(base_path, "data", "last_processed.json")
+        self.loader = loader
+        self.swaps = 0
+        self._marker = read_refresh_marker(self.marker_file)
+        self._current = corpus if corpus is not None else loader(config)
+        self.loaded_at = time.time()
+        self._refresh_lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def current(self):
+        return self._current
+
+    def refresh(self):
+        """Rebuild the corpus and swap it in if its contents changed. Returns True if it swapped.
+
+        Only one rebuild runs at a time; a call made while one is running returns False at once.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            marker = read_refresh_marker(self.marker_file)
+            start_time = time.perf_counter()
+            # Without the response cache: opening it for a new version clears the shared cache,
+            # which must not happen unless this snapshot is actually swapped in
+            snapshot = self.loader(self.config, response_cache=False)
+            self._marker = marker
+            old = self._current
+            if not snapshot or (old is not None and snapshot.version == old.version):
+                logging.info("Corpus rebuild found no changes; keeping the current snapshot.")
+                if snapshot is not None:
+                    snapshot.close()
+                return False
+            open_response_cache(snapshot, self.config)
+            self._current = snapshot
+            self.loaded_at = time.time()
+            self.swaps += 1
+            if old is not None:
+                retire = threading.Timer(RETIRE_DELAY, old.close)
+                retire.daemon = True
+                retire.start()
+            logging.info(
+                f"Swapped in corpus snapshot {snapshot.version} ({len(snapshot)} items, "
+                f"built in {time.perf_counter() - start_time:.2f}s), replacing {old.version if old else None}"
+            )
+            return True
+        except Exception as e:
+            logging.error(f"Corpus rebuild failed; keeping the current snapshot: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_in_background(self):
+        """Start refresh() on a daemon thread and return the thread."""
+        thread = threading.Thread(target=self.refresh, name="corpus-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def check(self):
+        """Start a background refresh if the refresh marker changed since the last load."""
+        marker = read_refresh_marker(self.marker_file)
+        if marker is not None and marker != self._marker:
+            logging.info(f"Compliance data refreshed at {marker}; rebuilding the corpus.")
+            self.refresh_in_background()
+            return True
+        return False
+
+    def watch(self, interval=60):
+        """Poll the refresh marker every interval seconds on a daemon thread.
+
+        Used by processes that do not run the scheduler themselves; a process that does
+        should pass refresh_in_background to it instead.
+        """
+        if self._watcher is not None:
+            return self._watcher
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check()
+                except Exception as e:
+                    logging.error(f"Corpus refresh check failed: {e}")
+
+        self._watcher = threading.Thread(target=poll, name="corpus-watch", daemon=True)
+        self._watcher.start()
+        return self._watcher
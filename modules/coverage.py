@@ -0,0 +1,164 @@
+# coverage.py
+import os
+import pickle
+import fnmatch
+import logging
+import numpy as np
+from crosswalk import _csr
+from parse_cache import save_pickle
+
+# Dimensions coverage can be grouped by
+GROUPS = ("benchmark", "severity", "type")
+
+def _compose(first, second):
+    """Return (sources, targets) pairs of the CSR product first x second, with duplicates."""
+    first_offsets, first_targets = first
+    second_offsets, second_targets = second
+    sources = np.repeat(np.arange(len(first_offsets) - 1), np.diff(first_offsets))
+    starts = second_offsets[first_targets]
+    counts = second_offsets[first_targets + 1] - starts
+    total = int(counts.sum())
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return np.repeat(sources, counts), second_targets[positions]
+
+class CoverageMatrix:
+    """Sparse rule x ATT&CK technique incidence matrix with vectorized coverage aggregations.
+
+    Row r lists the techniques rule r mitigates through its CCIs and their NIST SP 800-53
+    controls, the same rule -> cci -> control -> technique resolution the crosswalk graph
+    follows; rows and technique columns share the crosswalk's numbering. Each rule also
+    carries integer codes for its benchmark file, severity and type, so every question is a
+    boolean rule mask followed by a few whole-array operations rather than a loop over rules.
+
+        matrix.summary(matrix.rule_mask(benchmarks=["*Windows_Server_2022*"]))
+        matrix.coverage_by("severity")
+        matrix.uncovered(matrix.rule_mask(rule_type="STIG", severities=["high"]))
+    """
+
+    def __init__(self, version, rules, techniques, offsets, columns, codes, labels):
+        self.version = version
+        self.rules = rules
+        self.techniques = techniques
+        self.offsets = offsets
+        self.columns = columns
+        # Row index of every nonzero, for grouping nonzeros by a rule attribute
+        self.rows = np.repeat(np.arange(len(rules), dtype=np.int32), np.diff(offsets))
+        self.codes = codes
+        self.labels = labels
+
+    @classmethod
+    def build(cls, corpus, graph):
+        """Build the matrix from a loaded corpus and its crosswalk graph."""
+        rule_cci = graph.links["rule", "cci"]
+        cci_control = graph.links["cci", "control"]
+        control_technique = graph.links["control", "technique"]
+        rule_control = _csr(*_compose(rule_cci, cci_control), len(graph.names["rule"]))
+        offsets, columns = _csr(*_compose(rule_control, control_technique), len(graph.names["rule"]))
+
+        codes = {}
+        labels = {}
+        for group in GROUPS:
+            values = {}
+            codes[group] = np.fromiter(
+                (values.setdefault(value, len(values)) for value in cls._rule_values(corpus, graph, group)),
+                dtype=np.int32, count=len(graph.names["rule"])
+            )
+            labels[group] = list(values)
+        matrix = cls(corpus.version, graph.names["rule"], graph.names["technique"], offsets, columns, codes, labels)
+        logging.info(f"Built coverage matrix of {len(matrix.rules)} rules x {len(matrix.techniques)} techniques "
+                     f"with {len(columns)} links")
+        return matrix
+
+    @staticmethod
+    def _rule_values(corpus, graph, group):
+        """Yield each rule's value of group, in crosswalk rule order."""
+        if group == "type":
+            return ("SRG" if is_srg else "STIG" for is_srg in graph.rule_is_srg)
+        attribute = "file" if group == "benchmark" else group
+        return (getattr(corpus[rule_id], attribute) or "unknown" for rule_id in graph.names["rule"])
+
+    def rule_mask(self, benchmarks=None, severities=None, rule_type=None):
+        """Return a boolean mask of the rules matching every given filter.
+
+        benchmarks are benchmark file names or shell-style patterns ('*RHEL_9*'); severities
+        and rule_type ('STIG' or 'SRG') match exactly. Omitted filters match every rule.
+        """
+        mask = np.ones(len(self.rules), dtype=bool)
+        if benchmarks:
+            mask &= self._select("benchmark", lambda name: any(fnmatch.fnmatch(name, pattern) for pattern in benchmarks))
+        if severities:
+            mask &= self._select("severity", lambda name: name in severities)
+        if rule_type:
+            mask &= self._select("type", lambda name: name == rule_type)
+        return mask
+
+    def _select(self, group, matches):
+        """Return a boolean mask of the rules whose group value satisfies matches."""
+        selected = np.fromiter(map(matches, self.labels[group]), dtype=bool, count=len(self.labels[group]))
+        return selected[self.codes[group]]
+
+    def technique_counts(self, mask=None):
+        """Return, per technique, how many of the masked rules (all rules if None) mitigate it."""
+        columns = self.columns if mask is None else self.columns[mask[self.rows]]
+        return np.bincount(columns, minlength=len(self.techniques))
+
+    def covered(self, mask=None):
+        """Return a boolean vector of the techniques mitigated by at least one masked rule."""
+        return self.technique_counts(mask) > 0
+
+    def uncovered(self, mask=None):
+        """Return the ids of techniques no masked rule mitigates, sorted."""
+        return sorted(self.techniques[index] for index in np.flatnonzero(~self.covered(mask)))
+
+    def summary(self, mask=None):
+        """Return rule and technique coverage totals for the masked rules, with the uncovered technique ids."""
+        counts = self.technique_counts(mask)
+        covered = int(np.count_nonzero(counts))
+        return {
+            "rules": len(self.rules) if mask is None else int(np.count_nonzero(mask)),
+            "techniques": len(self.techniques),
+            "covered": covered,
+            "coverage": covered / len(self.techniques) if len(self.techniques) else 0.0,
+            "uncovered": self.uncovered(mask)
+        }
+
+    def coverage_by(self, group, mask=None):
+        """Return [{group: name, "rules", "covered", "coverage"}] for every value of group, most coverage first.
+
+        All groups are counted in one pass: each nonzero is keyed by (group code, technique)
+        and the distinct keys are counted per group.
+        """
+        if group not in GROUPS:
+            raise ValueError(f"Unknown coverage group {group!r}; expected one of {', '.join(GROUPS)}")
+        codes = self.codes[group]
+        group_count = len(self.labels[group])
+        technique_count = len(self.techniques)
+        rows = self.rows if mask is None else self.rows[mask[self.rows]]
+        columns = self.columns if mask is None else self.columns[mask[self.rows]]
+        keys = np.zeros(group_count * technique_count, dtype=bool)
+        keys[codes[rows].astype(np.int64) * technique_count + columns] = True
+        covered = keys.reshape(group_count, technique_count).sum(axis=1)
+        rules = np.bincount(codes if mask is None else codes[mask], minlength=group_count)
+        return [
+            {group: self.labels[group][index], "rules": int(rules[index]), "covered": int(covered[index]),
+             "coverage": int(covered[index]) / technique_count if technique_count else 0.0}
+            for index in np.lexsort((np.argsort(np.argsort(np.array(self.labels[group], dtype=object))), -covered))
+            if rules[index]
+        ]
+
+def load_coverage(corpus, index_file):
+    """Return the cached coverage matrix for this corpus version, rebuilding and saving it if stale or missing."""
+    if os.path.exists(index_file):
+        try:
+            with open(index_file, 'rb') as f:
+                matrix = pickle.load(f)
+            if matrix.version == corpus.version:
+                logging.info(f"Loaded coverage matrix from {index_file}")
+                return matrix
+            logging.info("Coverage matrix is out of date with the corpus; rebuilding.")
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logging.warning(f"Failed to read coverage matrix {index_file}: {e}. Rebuilding.")
+
+    matrix = CoverageMatrix.build(corpus, corpus.crosswalk)
+    save_pickle(index_file, matrix)
+    return matrix
@@ -0,0 +1,210 @@
+# crosswalk.py
+import os
+import re
+import pickle
+import logging
+import numpy as np
+from attack_mapping import load_attack_mapping, nist_control
+from parse_cache import save_pickle
+
+# Bumped when the graph's structure changes, so cached graphs are rebuilt
+GRAPH_VERSION = 2
+# Entity kinds in crosswalk order: each is linked to its neighbours in this chain
+KINDS = ("srg", "rule", "cci", "control", "technique")
+# A base requirement, optionally with the technology-specific suffix, e.g. 'SRG-OS-000480-GPOS-00227'
+SRG_ID_RE = re.compile(r"(SRG-[A-Z]+-\d+)(?:-[A-Z0-9]+-\d+)?")
+
+def srg_requirement(text):
+    """Return the full SRG requirement id (e.g. 'SRG-OS-000480-GPOS-00227') a Group title names, or None."""
+    match = SRG_ID_RE.match(text or "")
+    return match.group(0) if match else None
+
+def srg_base(srg_id):
+    """Return the base requirement of a full SRG requirement id, e.g. 'SRG-OS-000480'."""
+    return SRG_ID_RE.match(srg_id).group(1)
+
+def _csr(sources, targets, count):
+    """Return (offsets, targets) adjacency arrays for deduplicated (source, target) pairs of count sources."""
+    pairs = np.unique(np.column_stack((
+        np.asarray(sources, dtype=np.int64),
+        np.asarray(targets, dtype=np.int64)
+    )).reshape(-1, 2), axis=0)
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[:, 0], minlength=count), out=offsets[1:])
+    return offsets, pairs[:, 1].astype(np.int32)
+
+class CrosswalkGraph:
+    """Bidirectional adjacency index linking SRG requirements, STIG/SRG rules, CCIs, NIST controls and ATT&CK techniques.
+
+    Each kind numbers its entities 0..n-1 (techniques in the corpus technique-table order).
+    SRG requirements are keyed by the full id in each rule's Group title; a base id such as
+    'SRG-OS-000480' stands for all the requirements derived from it.
+    Links between neighbouring kinds are stored in both directions as CSR arrays, so a hop
+    from a set of entities is one gather and np.unique, and a query such as "which STIG
+    rules mitigate T1078" (technique -> control -> cci -> rule) takes a few microseconds.
+
+        srg ⇄ rule        the SRG requirement named by each rule's Group title
+        rule ⇄ cci        the CCIs each rule cites
+        cci ⇄ control     the NIST SP 800-53 controls each CCI references
+        control ⇄ technique  the ATT&CK techniques mapped to each control
+    """
+
+    def __init__(self, version, names, rule_is_srg, links):
+        self.format = GRAPH_VERSION
+        self.version = version
+        self.names = names
+        self.ids = {kind: {name: index for index, name in enumerate(names[kind])} for kind in KINDS}
+        # Rank of each entity in id order, so results sort without comparing strings
+        self.ranks = {kind: np.argsort(np.argsort(np.array(names[kind], dtype=object), kind="stable")) for kind in KINDS}
+        self.rule_is_srg = rule_is_srg
+        self.links = links
+        self.srg_children = {}
+        for index, srg_id in enumerate(names["srg"]):
+            self.srg_children.setdefault(srg_base(srg_id), []).append(index)
+
+    @classmethod
+    def build(cls, corpus, controls):
+        """Build the graph from a loaded corpus and the ATT&CK mapping's {control_id: [technique dicts]}."""
+        names = {kind: [] for kind in KINDS}
+        ids = {kind: {} for kind in KINDS}
+
+        def node(kind, name):
+            index = ids[kind].get(name)
+            if index is None:
+                index = ids[kind][name] = len(names[kind])
+                names[kind].append(name)
+            return index
+
+        for tech in corpus.techniques:
+            node("technique", tech.id)
+        edges = {pair: ([], []) for pair in zip(KINDS, KINDS[1:])}
+
+        def link(source_kind, source, target_kind, target):
+            sources, targets = edges[source_kind, target_kind]
+            sources.append(source)
+            targets.append(target)
+
+        rule_is_srg = []
+        for rule in corpus.rules():
+            row = node("rule", rule.id)
+            rule_is_srg.append(rule.type == "SRG")
+            srg = srg_requirement(rule.srg)
+            if srg:
+                link("srg", node("srg", srg), "rule", row)
+            for cci_id in rule.ccis:
+                link("rule", row, "cci", node("cci", cci_id))
+        for cci in corpus.ccis():
+            row = node("cci", cci.id)
+            for control_id in filter(None, map(nist_control, cci.references)):
+                link("cci", row, "control", node("control", control_id))
+        for control_id, techniques in controls.items():
+            row = node("control", control_id)
+            for tech in techniques:
+                link("control", row, "technique", node("technique", tech["id"]))
+
+        links = {}
+        for (source_kind, target_kind), (sources, targets) in edges.items():
+            links[source_kind, target_kind] = _csr(sources, targets, len(names[source_kind]))
+            links[target_kind, source_kind] = _csr(targets, sources, len(names[target_kind]))
+        graph = cls(corpus.version, names, np.asarray(rule_is_srg, dtype=bool), links)
+        logging.info("Built crosswalk graph with " + ", ".join(f"{len(names[kind])} {kind}s" for kind in KINDS))
+        return graph
+
+    def find(self, name):
+        """Return (kind, indexes) of the entities called name, or None.
+
+        A full SRG requirement id names one entity and a base id names every requirement
+        derived from it; any other name matches one rule, CCI, technique or control.
+        """
+        srg = srg_requirement(name)
+        if srg is not None:
+            if srg == srg_base(srg):
+                indexes = self.srg_children.get(srg)
+            else:
+                index = self.ids["srg"].get(srg)
+                indexes = [index] if index is not None else None
+            return ("srg", indexes) if indexes else None
+        for kind in ("rule", "cci", "technique", "control"):
+            index = self.ids[kind].get(name)
+            if index is not None:
+                return kind, [index]
+        return None
+
+    def step(self, source_kind, target_kind, indexes):
+        """Return the distinct target_kind neighbours of an array of source_kind entities, in index order."""
+        offsets, targets = self.links[source_kind, target_kind]
+        indexes = np.asarray(indexes, dtype=np.int64)
+        starts = offsets[indexes]
+        counts = offsets[indexes + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int32)
+        # Positions of every neighbour of every source in one gather; a mask over the target
+        # kind then deduplicates in time linear in its size, without sorting
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        seen = np.zeros(len(self.names[target_kind]), dtype=bool)
+        seen[targets[positions]] = True
+        return np.flatnonzero(seen)
+
+    def walk(self, kind, indexes, target_kind):
+        """Follow links along the crosswalk chain from kind to target_kind; returns target_kind indexes."""
+        if target_kind not in KINDS:
+            raise ValueError(f"Unknown crosswalk kind {target_kind!r}; expected one of {', '.join(KINDS)}")
+        indexes = np.unique(np.asarray(indexes, dtype=np.int64))
+        position, target = KINDS.index(kind), KINDS.index(target_kind)
+        direction = 1 if target > position else -1
+        while position != target:
+            indexes = self.step(KINDS[position], KINDS[position + direction], indexes)
+            position += direction
+        return indexes
+
+    def related(self, name, target_kind, rule_type=None):
+        """Return the ids of target_kind entities linked to the entity called name, sorted.
+
+        With target_kind 'rule', rule_type 'STIG' or 'SRG' keeps only rules of that type.
+        The entities name stands for are returned when target_kind is their own kind.
+        """
+        found = self.find(name)
+        if found is None:
+            return []
+        kind, indexes = found
+        indexes = self.walk(kind, indexes, target_kind)
+        if target_kind == "rule" and rule_type is not None:
+            indexes = indexes[self.rule_is_srg[indexes] == (rule_type == "SRG")]
+        return self.sorted_names(target_kind, indexes)
+
+    def sorted_names(self, kind, indexes):
+        """Return the ids of kind entities at indexes, sorted."""
+        entity_names = self.names[kind]
+        return [entity_names[index] for index in indexes[np.argsort(self.ranks[kind][indexes])]]
+
+    def crosswalk(self, name):
+        """Return (kind, {other_kind: [ids]}) for everything linked to the entity called name, or None.
+
+        A base SRG id also lists the requirements it stands for under its own kind.
+        """
+        found = self.find(name)
+        if found is None:
+            return None
+        kind, indexes = found
+        return kind, {
+            target_kind: self.sorted_names(target_kind, self.walk(kind, indexes, target_kind))
+            for target_kind in KINDS if target_kind != kind or len(indexes) > 1
+        }
+
+def load_crosswalk(corpus, index_file, framework, mapping_file):
+    """Return the cached crosswalk graph for this corpus version, rebuilding and saving it if stale or missing."""
+    if os.path.exists(index_file):
+        try:
+            with open(index_file, 'rb') as f:
+                graph = pickle.load(f)
+            if getattr(graph, "format", None) == GRAPH_VERSION and graph.version == corpus.version:
+                logging.info(f"Loaded crosswalk graph from {index_file}")
+                return graph
+            logging.info("Crosswalk graph is out of date with the corpus; rebuilding.")
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logging.warning(f"Failed to read crosswalk graph {index_file}: {e}. Rebuilding.")
+
+    graph = CrosswalkGraph.build(corpus, load_attack_mapping(framework, mapping_file))
+    save_pickle(index_file, graph)
+    return graph
@@ -1,14 +1,19 @@
 import os
+import io
 import json
 import requests
+from requests.adapters import HTTPAdapter
 import tempfile
 import shutil
-from datetime import datetime, timedelta
+import hashlib
+import threading
+from datetime import datetime
 import zipfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from email.utils import parsedate_to_datetime
 import pytz
 import logging
+from zip_extractor import update_library
 
 # Configure logging
 logging.basicConfig(
@@ -17,21 +22,235 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def download_file(url, destination):
-    """Download a file from a URL to a destination path."""
+# Shared HTTP settings: (connect, read) timeout in seconds and connections kept per host
+HTTP_TIMEOUT = (10, 60)
+HTTP_MAX_CONNECTIONS_PER_HOST = 4
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Return the pooled requests session used for all fetcher HTTP traffic.
+
+    Connections are reused across calls and threads; up to HTTP_MAX_CONNECTIONS_PER_HOST
+    are kept open per host. Extra concurrent requests get a short-lived connection rather
+    than waiting for a pooled one, so a leaked response can never stall the fetcher.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_MAX_CONNECTIONS_PER_HOST)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+class DownloadValidators:
+    """Per-URL ETag/Last-Modified validators and content hashes, persisted as JSON between runs.
+
+    Validators of a completed download make the next request conditional, and those of an
+    interrupted one let its .part file be resumed with a Range request.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"Failed to read download validators {path}: {e}. Starting empty.")
+
+    def get(self, url):
+        with self._lock:
+            return dict(self.entries.get(url, {}))
+
+    def update(self, url, **fields):
+        """Merge fields into the entry for url (a None value removes the field) and save."""
+        with self._lock:
+            entry = self.entries.setdefault(url, {})
+            for key, value in fields.items():
+                if value is None:
+                    entry.pop(key, None)
+                else:
+                    entry[key] = value
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            write_last_processed(self.path, self.entries)
+
+def _part_hasher(part_path, chunk_size):
+    """Return a SHA-256 object primed with the contents of an existing partial download."""
+    digest = hashlib.sha256()
+    with open(part_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest
+
+def download_file(url, destination, validators=None, chunk_size=65536):
+    """Download a file from a URL to a destination path.
+
+    With a DownloadValidators store the request is conditional on the ETag/Last-Modified of
+    the copy already at destination, and an interrupted download left in destination + '.part'
+    is resumed with a Range request. The body is hashed as it is written.
+    Returns True if new content was written, None if the server reported it unchanged and
+    False on failure.
+    """
+    part_path = destination + ".part"
+    entry = validators.get(url) if validators is not None else {}
+    headers = {}
+    if os.path.exists(destination) and entry.get("size") == os.path.getsize(destination):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    # If-Range makes the server send the whole body instead if the resource changed since the partial
+    resume_validator = entry.get("part_etag") or entry.get("part_last_modified")
+    if offset and resume_validator:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = resume_validator
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        with open(destination, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        logging.info(f"Downloaded {os.path.basename(destination)} successfully.")
-        print(f"Downloaded {os.path.basename(destination)} successfully.")
-        return True
+        with get_session().get(url, stream=True, headers=headers, timeout=HTTP_TIMEOUT) as response:
+            if response.status_code == 304:
+                logging.info(f"{os.path.basename(destination)} is unchanged; skipping download.")
+                print(f"{os.path.basename(destination)} is unchanged; skipping download.")
+                return None
+            content_range = response.headers.get("Content-Range", "")
+            misaligned = response.status_code == 206 and not content_range.startswith(f"bytes {offset}-")
+            if "Range" in headers and (response.status_code == 416 or misaligned):
+                # The partial no longer lines up with the resource (or the server sent some other
+                # range, which must not be written as the whole file); start over
+                logging.warning(f"Server rejected resume of {os.path.basename(part_path)}; restarting download.")
+                os.remove(part_path)
+                # Release this connection before the retry asks the pool for one
+                response.close()
+                return download_file(url, destination, validators, chunk_size)
+            if misaligned:
+                raise requests.exceptions.HTTPError(f"unrequested partial content ({content_range or 'no Content-Range'})", response=response)
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                logging.info(f"Resuming {os.path.basename(destination)} at byte {offset}")
+                digest = _part_hasher(part_path, chunk_size)
+                mode = 'ab'
+            else:
+                offset = 0
+                digest = hashlib.sha256()
+                mode = 'wb'
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if validators is not None:
+                validators.update(url, part_etag=etag, part_last_modified=last_modified)
+
+            expected = response.headers.get("Content-Length")
+            expected = offset + int(expected) if expected is not None and "Content-Encoding" not in response.headers else None
+            written = offset
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    written += len(chunk)
+            if expected is not None and written != expected:
+                raise requests.exceptions.ConnectionError(f"received {written} of {expected} bytes")
+            os.replace(part_path, destination)
+            if validators is not None:
+                validators.update(
+                    url, etag=etag, last_modified=last_modified, sha256=digest.hexdigest(), size=written,
+                    part_etag=None, part_last_modified=None
+                )
+            logging.info(f"Downloaded {os.path.basename(destination)} successfully (sha256 {digest.hexdigest()}).")
+            print(f"Downloaded {os.path.basename(destination)} successfully.")
+            return True
     except requests.exceptions.HTTPError as e:
         logging.error(f"Failed to download {url}: {e}")
         print(f"Failed to download {url}: {e}")
         return False
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Download of {url} was interrupted: {e}. Keeping {os.path.basename(part_path)} to resume.")
+        print(f"Download of {url} was interrupted: {e}")
+        return False
+
+class RangeNotSupportedError(Exception):
+    """Raised when a server answers a Range request with something other than 206 Partial Content."""
+
+class HttpRangeFile(io.RawIOBase):
+    """Read-only, seekable view of a remote file that fetches exactly the byte ranges read.
+
+    Wrap it in io.BufferedReader so the many small header reads zipfile makes share one
+    readahead request. Every range carries If-Range, so if the file changes mid-read the
+    server sends a full 200 response and RangeNotSupportedError is raised instead of mixing
+    bytes from two versions.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.position = 0
+        self.requests = 0
+        self.bytes_fetched = 0
+        self.validator = None
+        with self._get("bytes=0-0") as response:
+            self.validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+            self.size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+
+    def _get(self, byte_range):
+        headers = {"Range": byte_range}
+        if self.validator:
+            headers["If-Range"] = self.validator
+        response = get_session().get(self.url, headers=headers, stream=True, timeout=HTTP_TIMEOUT)
+        if response.status_code != 206 or "/" not in response.headers.get("Content-Range", ""):
+            response.close()
+            raise RangeNotSupportedError(f"{self.url} answered a Range request with HTTP {response.status_code}")
+        self.requests += 1
+        self.bytes_fetched += int(response.headers.get("Content-Length", 0))
+        return response
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        end = min(self.position + len(buffer), self.size)
+        if end <= self.position:
+            return 0
+        data = self._get(f"bytes={self.position}-{end - 1}").content
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+def update_library_remote(url, stig_dir, srg_dir, manifest_file, docs_dir=None, read_ahead=64 * 1024):
+    """Update the benchmark directories from a remote library zip without downloading all of it.
+
+    The central directory is read with Range requests and only new or changed inner
+    archives are fetched. Returns the update_library report, or None if the server does
+    not honor Range requests (or the file changed while reading) and a full download is needed.
+    """
+    try:
+        remote = HttpRangeFile(url)
+        with io.BufferedReader(remote, buffer_size=read_ahead) as stream:
+            report = update_library(stream, stig_dir, srg_dir, manifest_file, docs_dir, library_name=url.split('/')[-1])
+    except (RangeNotSupportedError, requests.exceptions.RequestException, zipfile.BadZipFile, KeyError, ValueError) as e:
+        logging.warning(f"Range update of {url} is not possible ({e}); falling back to a full download.")
+        return None
+    logging.info(f"Fetched {remote.bytes_fetched} of {remote.size} bytes from {url} in {remote.requests} range requests.")
+    print(f"Fetched {remote.bytes_fetched} of {remote.size} bytes of the library using range requests.")
+    return report
 
 def unzip_file(zip_path, extract_dir):
     """Unzip a file to a specified directory."""
@@ -44,30 +263,42 @@ def unzip_file(zip_path, extract_dir):
         logging.error(f"Failed to unzip {zip_path}: {e}")
         raise
 
+def _probe_url(url):
+    """Return True if a HEAD request for url succeeds."""
+    try:
+        return get_session().head(url, timeout=HTTP_TIMEOUT).status_code == 200
+    except requests.exceptions.RequestException as e:
+        logging.debug(f"Probe of {url} failed: {e}")
+        return False
+
 def get_latest_available_zip_info(base_url, max_months_back=12):
-    """Find the latest available STIG/SRG zip file by checking recent months."""
+    """Find the latest available STIG/SRG zip file by probing recent months concurrently."""
     current_date = datetime.now()
+    candidates = []
     for i in range(max_months_back):
-        check_date = current_date - timedelta(days=30 * i)
-        month_name = check_date.strftime("%B")
-        year = check_date.year
-        url = base_url.format(month=month_name, year=year)
-        try:
-            response = requests.head(url)
-            if response.status_code == 200:
-                month_num = check_date.month
+        year, month = divmod(current_date.year * 12 + current_date.month - 1 - i, 12)
+        candidates.append((year, month + 1))
+    with ThreadPoolExecutor(max_workers=HTTP_MAX_CONNECTIONS_PER_HOST) as executor:
+        futures = []
+        for year, month in candidates:
+            month_name = datetime(year, month, 1).strftime("%B")
+            url = base_url.format(month=month_name, year=year)
+            futures.append((executor.submit(_probe_url, url), url, month_name, year, month))
+        # Candidates are newest first, so the first hit in order is the latest library
+        for future, url, month_name, year, month in futures:
+            if future.result():
+                for pending, *_ in futures:
+                    pending.cancel()
                 filename = f"U_SRG-STIG_Library_{month_name}_{year}.zip"
                 logging.info(f"Found latest STIG/SRG zip: {filename}")
-                return url, filename, (year, month_num)
-        except requests.exceptions.RequestException:
-            continue
-    logging.warning("No recent STIG/SRG library found within the last 12 months.")
+                return url, filename, (year, month)
+    logging.warning(f"No recent STIG/SRG library found within the last {max_months_back} months.")
     return None, None, None
 
 def get_last_modified_date(url):
     """Retrieve the Last-Modified date from the HTTP header of a URL."""
     try:
-        response = requests.head(url)
+        response = get_session().head(url, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
         last_modified = response.headers.get("Last-Modified")
         if last_modified:
@@ -78,11 +309,11 @@ def get_last_modified_date(url):
         logging.error(f"Error checking Last-Modified for {url}: {e}")
         return None
 
-def download_parallel(urls_destinations):
+def download_parallel(urls_destinations, validators=None):
     """Download multiple files in parallel using up to 4 concurrent threads."""
     results = []
     with ThreadPoolExecutor(max_workers=4) as executor:
-        future_to_url = {executor.submit(download_file, url, dest): (url, dest) for url, dest in urls_destinations}
+        future_to_url = {executor.submit(download_file, url, dest, validators): (url, dest) for url, dest in urls_destinations}
         for future in as_completed(future_to_url):
             url, dest = future_to_url[future]
             try:
@@ -106,33 +337,17 @@ def write_last_processed(last_processed_file, data):
         logging.error(f"Failed to write {last_processed_file}: {e}")
         raise
 
-def extract_nested_zips(zip_path, base_extract_dir, stig_dir, srg_dir, docs_dir):
-    """Recursively extract zip files and move XMLs to stig_dir/srg_dir, PDFs to docs_dir."""
-    temp_extract_dir = os.path.join(base_extract_dir, f"extract_{os.path.basename(zip_path)}")
-    os.makedirs(temp_extract_dir, exist_ok=True)
-    unzip_file(zip_path, temp_extract_dir)
-
-    for root, _, files in os.walk(temp_extract_dir):
-        for file in files:
-            src_path = os.path.join(root, file)
-            if file.endswith('.zip'):
-                # Recursively extract nested zips
-                extract_nested_zips(src_path, base_extract_dir, stig_dir, srg_dir, docs_dir)
-            elif file.endswith('.xml'):
-                # Move XML files based on parent zip name
-                parent_zip = os.path.basename(zip_path).upper()
-                dest_dir = srg_dir if "_SRG" in parent_zip else stig_dir
-                dest_path = os.path.join(dest_dir, file)
-                shutil.move(src_path, dest_path)
-                logging.info(f"Moved {file} to {dest_path}")
-            elif file.endswith('.pdf') and file.startswith('_'):
-                # Move underscore-prefixed PDFs to docs_dir
-                dest_path = os.path.join(docs_dir, file)
-                shutil.move(src_path, dest_path)
-                logging.info(f"Moved {file} to {dest_path}")
-
-    # Clean up temporary extraction directory
-    shutil.rmtree(temp_extract_dir, ignore_errors=True)
+def update_compliance_store(config, root_dir):
+    """Bring the SQLite compliance store up to date when it is the configured corpus backend."""
+    if config.get("corpus_backend") != "sqlite":
+        return None
+    # Imported here: it loads the parsers (and their logging setup) the other backends never need
+    from compliance_store import update_store
+    report = update_store(config, root_dir)
+    if report["added"] or report["changed"] or report["removed"]:
+        print(f"Compliance store: {len(report['added'])} files added, {len(report['changed'])} changed, "
+              f"{len(report['removed'])} removed.")
+    return report
 
 def fetch_data(config_path):
     """Fetch data files based on config.json and save to appropriate directories."""
@@ -182,6 +397,9 @@ def fetch_data(config_path):
         last_updated = utc.localize(datetime(1970, 1, 1))
         write_last_processed(last_processed_file, default_last_processed)
 
+    # ETag/Last-Modified validators for conditional and resumed downloads
+    validators = DownloadValidators(os.path.join(root_dir, config.get("download_validators_file", "data/cache/download_validators.json")))
+
     # Prepare parallel downloads
     download_tasks = []
 
@@ -217,7 +435,7 @@ def fetch_data(config_path):
 
     # Execute parallel downloads
     if download_tasks:
-        results = download_parallel(download_tasks)
+        results = download_parallel(download_tasks, validators)
         for url, dest, success in results:
             if url == mapping_url and success and current_mapping_modified and current_mapping_modified > last_updated:
                 last_processed = {
@@ -225,15 +443,14 @@ def fetch_data(config_path):
                 }
                 write_last_processed(last_processed_file, last_processed)
                 logging.info(f"Updated {mapping_filename} based on new modification date.")
-            elif url == mapping_url and not success:
+            elif url == mapping_url and success is False:
                 logging.warning(f"Failed to update {mapping_filename} despite newer modification date.")
 
-    # Download CCI list
+    # Download CCI list; the zip is kept so the next run can ask whether it changed
     cci_url = config["cci_list_url"]
     cci_zip = os.path.join(cci_list_dir, "U_CCI_List.zip")
-    if download_file(cci_url, cci_zip):
+    if download_file(cci_url, cci_zip, validators):
         unzip_file(cci_zip, cci_list_dir)
-        os.remove(cci_zip)
         logging.info("Processed CCI list successfully.")
 
     # Handle STIGs and SRGs
@@ -241,31 +458,46 @@ def fetch_data(config_path):
     latest_url, latest_filename, latest_date = get_latest_available_zip_info(base_url)
     if latest_url is None:
         logging.warning("No recent STIG/SRG library found; skipping STIG/SRG processing.")
+        update_compliance_store(config, root_dir)
         return
 
     # Compare latest_date (year, month) with last_updated timestamp
     latest_date_dt = utc.localize(datetime(latest_date[0], latest_date[1], 1))
     if latest_date_dt > last_updated:
-        dest_path = os.path.join(stig_zips_dir, latest_filename)
-        if download_file(latest_url, dest_path):
-            try:
-                extract_nested_zips(dest_path, stig_zips_dir, stig_dir, srg_dir, docs_dir)
-                # Update last_processed with the current time after successful processing
-                last_processed = {
-                    "last_updated": datetime.now(utc).isoformat()
-                }
-                write_last_processed(last_processed_file, last_processed)
-                logging.info(f"Successfully processed {latest_filename}")
-            except Exception as e:
-                logging.error(f"Error processing {latest_filename}: {e}")
-                raise
-            finally:
-                # Clean up the downloaded zip file
-                if os.path.exists(dest_path):
-                    os.remove(dest_path)
-                    logging.info(f"Removed {dest_path}")
+        manifest_file = os.path.join(root_dir, config.get("library_manifest_file", "data/library_manifest.json"))
+        report = None
+        if os.path.exists(manifest_file):
+            # With a manifest to compare against, fetch only the inner archives that changed
+            report = update_library_remote(latest_url, stig_dir, srg_dir, manifest_file, docs_dir)
+        if report is None:
+            dest_path = os.path.join(stig_zips_dir, latest_filename)
+            if download_file(latest_url, dest_path, validators):
+                try:
+                    report = update_library(dest_path, stig_dir, srg_dir, manifest_file, docs_dir)
+                except Exception as e:
+                    logging.error(f"Error processing {latest_filename}: {e}")
+                    raise
+                finally:
+                    # Clean up the downloaded zip file
+                    if os.path.exists(dest_path):
+                        os.remove(dest_path)
+                        logging.info(f"Removed {dest_path}")
+        if report is not None:
+            for change in ("added", "changed", "removed"):
+                if report[change]:
+                    print(f"{change.capitalize()} benchmarks ({len(report[change])}): {', '.join(report[change])}")
+            print(f"{report['unchanged']} benchmarks unchanged.")
+            # Update last_processed with the current time after successful processing
+            last_processed = {
+                "last_updated": datetime.now(utc).isoformat(),
+                "library": latest_filename,
+                "benchmarks": {change: len(report[change]) for change in ("added", "changed", "removed")}
+            }
+            write_last_processed(last_processed_file, last_processed)
+            logging.info(f"Successfully processed {latest_filename}")
     else:
         logging.info(f"Latest STIG/SRG library {latest_filename} is already processed; skipping.")
+    update_compliance_store(config, root_dir)
 
 if __name__ == "__main__":
     try:
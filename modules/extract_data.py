@@ -1,11 +1,10 @@
 ##################################################
 ###           Extract and move files           ###
 ##################################################
-import zipfile
 import os
-import shutil
 from colorama import Fore, Style
 import json
+from zip_extractor import extract_library
 
 
 def load_config(config_file="config.json"):
@@ -34,44 +33,24 @@ def load_config(config_file="config.json"):
 def extract_and_sort_files(config, disa_file, base_path):
     """Extract the DISA zip file and sort contents into SRG and STIG directories.
 
+    Only the XML benchmarks are written; inner zips are read in memory rather than
+    extracted to the file imports directory.
+
     Args:
         config (dict): Configuration settings from config file.
         disa_file (str): Path to the downloaded DISA zip file.
         base_path (str): Base directory path for file operations.
     """
-    file_location = os.path.join(base_path, config["file_imports_dir"]) + '/'
-    srg_folder = os.path.join(base_path, config["srg_dir"]) + '/'
-    stig_folder = os.path.join(base_path, config["stig_dir"]) + '/'
-
-    # Extract files
-    print(Fore.MAGENTA + f"Extracting files to: {file_location}")
-    with zipfile.ZipFile(disa_file, 'r') as zObject:
-        zObject.extractall(path=file_location)
-
-    # Move SRGs and STIGs
-    print(Fore.CYAN + f"Checking for SRGs and STIGs in: {file_location}")
-    files = os.listdir(file_location)
-    for f in files:
-        if f.endswith(config["srg_zip_suffix"]):
-            print(Fore.CYAN + f"Moving {f} to {srg_folder}")
-            shutil.move(file_location + f, srg_folder + f)
-        elif f.endswith(config["zip_suffix"]):
-            print(Fore.CYAN + f"Moving {f} to {stig_folder}")
-            shutil.move(file_location + f, stig_folder + f)
-
-    # Unzip SRGs and STIGs, then sort XML files
-    for folder, suffix in [(srg_folder, "SRG"), (stig_folder, "STIG")]:
-        for item in os.listdir(folder):
-            if not item.endswith(config["zip_suffix"]):
-                continue
-            file_name = os.path.abspath(folder + item)
-            with zipfile.ZipFile(file_name, 'r') as zip_ref:
-                zip_ref.extractall(folder)
-            os.remove(file_name)
-
-        for subdir, _, files in os.walk(folder):
-            for f in files:
-                if f.endswith(config["xml_suffix"]):
-                    print(Fore.LIGHTYELLOW_EX + f"Moving {f} to {folder}")
-                    shutil.move(os.path.join(subdir, f), folder + f)
+    srg_folder = os.path.join(base_path, config["srg_dir"])
+    stig_folder = os.path.join(base_path, config["stig_dir"])
+
+    # Stream benchmarks out of the nested zips straight into the SRG and STIG folders
+    print(Fore.MAGENTA + f"Extracting benchmarks from: {disa_file}")
+    written = extract_library(
+        disa_file, stig_folder, srg_folder,
+        is_srg=lambda zip_name: zip_name.endswith(config["srg_zip_suffix"]),
+        xml_suffix=config["xml_suffix"]
+    )
+    for path in written:
+        print(Fore.LIGHTYELLOW_EX + f"Extracted {os.path.basename(path)} to {os.path.dirname(path)}")
 print(Style.RESET_ALL)
@@ -0,0 +1,124 @@
+# parse_cache.py
+import os
+import hashlib
+import logging
+import pickle
+import tempfile
+
+# Bump when the shape of cached records changes so stale caches are discarded
+CACHE_VERSION = 3
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def save_pickle(path, obj):
+    """Pickle obj to path atomically so an interrupted write never leaves a truncated file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_file = tempfile.NamedTemporaryFile(delete=False, dir=directory or None, suffix=".tmp")
+    try:
+        pickle.dump(obj, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_file.close()
+        os.replace(temp_file.name, path)
+        return True
+    except Exception as e:
+        temp_file.close()
+        os.unlink(temp_file.name)
+        logging.error(f"Failed to write {path}: {e}")
+        return False
+
+class ParseCache:
+    """Per-file cache of parsed records, invalidated by path, size, mtime and content hash."""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    def load(self):
+        """Load entries from disk, starting empty if the cache is missing, stale or corrupt."""
+        if not os.path.exists(self.cache_file):
+            logging.info(f"Parse cache not found at {self.cache_file}; starting cold.")
+            return
+        try:
+            with open(self.cache_file, 'rb') as f:
+                cache = pickle.load(f)
+            if cache.get("version") != CACHE_VERSION:
+                logging.info(f"Parse cache {self.cache_file} has an old format; discarding.")
+                return
+            self.entries = cache["files"]
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError) as e:
+            logging.warning(f"Failed to read parse cache {self.cache_file}: {e}. Starting cold.")
+
+    def save(self):
+        """Write the cache atomically if it changed, so an interrupted run never leaves a truncated file."""
+        if not self.dirty:
+            return
+        if save_pickle(self.cache_file, {"version": CACHE_VERSION, "files": self.entries}):
+            self.dirty = False
+            logging.info(f"Saved parse cache with {len(self.entries)} files to {self.cache_file}")
+
+    def get(self, path):
+        """Return cached records for path if the file is unchanged since it was parsed, else None.
+
+        Size and mtime are checked first; if only the mtime differs (e.g. the file was
+        re-extracted with identical contents) the content hash decides and the entry is refreshed.
+        """
+        entry = self.entries.get(path)
+        stat = os.stat(path)
+        if entry is not None and entry["size"] == stat.st_size:
+            if entry["mtime_ns"] == stat.st_mtime_ns:
+                self.hits += 1
+                return entry["records"]
+            if entry["sha256"] == hash_file(path):
+                entry["mtime_ns"] = stat.st_mtime_ns
+                self.dirty = True
+                self.hits += 1
+                return entry["records"]
+        self.misses += 1
+        return None
+
+    def put(self, path, records, sha256=None):
+        """Store freshly parsed records for path along with its size, mtime and content hash.
+
+        Pass sha256 when the caller already hashed the file (e.g. in a worker process).
+        """
+        stat = os.stat(path)
+        self.entries[path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256 or hash_file(path),
+            "records": records
+        }
+        self.dirty = True
+
+    def fingerprint(self, paths, extra_hashes=()):
+        """Return a short digest identifying the contents of the cached files among paths.
+
+        File names rather than full paths are used so the fingerprint survives moving the checkout.
+        """
+        digest = hashlib.sha256(f"v{CACHE_VERSION}\n".encode())
+        for path in paths:
+            entry = self.entries.get(path)
+            if entry is not None:
+                digest.update(f"{os.path.basename(path)}:{entry['sha256']}\n".encode())
+        for extra in extra_hashes:
+            digest.update(f"{extra}\n".encode())
+        return digest.hexdigest()[:16]
+
+    def prune(self, paths):
+        """Drop entries for files that are no longer present in the library."""
+        stale = set(self.entries) - set(paths)
+        for path in stale:
+            del self.entries[path]
+        if stale:
+            self.dirty = True
+            logging.info(f"Pruned {len(stale)} stale entries from the parse cache.")
@@ -1,8 +1,12 @@
 # pdf_parser.py
 import os
 import glob
+import json
 import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import pdfplumber
+from parse_cache import hash_file
 
 # Configure logging
 logging.basicConfig(
@@ -11,11 +15,49 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def load_acronym_mapping(docs_dir=None):
-    """Load acronym mappings from the latest _STIG_Acronym_List_*.pdf in docs_dir."""
+def _extract_page_rows(pdf_path, start, stop):
+    """Extract (acronym, meaning) rows from the tables on pages [start, stop) of a PDF."""
+    rows = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            for table in page.extract_tables():
+                for row in table:
+                    if len(row) >= 2 and row[0] and row[1]:  # Ensure row has acronym and meaning
+                        rows.append((row[0].strip(), row[1].strip().replace('\n', ' ')))
+    return rows
+
+def extract_acronyms(pdf_path, workers=None):
+    """Extract the acronym table from a PDF, splitting its pages across worker processes.
+
+    Rows are merged in page order so a later definition of an acronym wins, as it did
+    when pages were read sequentially.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+    workers = min(workers or os.cpu_count() or 1, page_count)
+    if workers <= 1:
+        return dict(_extract_page_rows(pdf_path, 0, page_count))
+
+    chunk = -(-page_count // workers)  # Ceiling division
+    ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+    acronym_map = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_extract_page_rows, pdf_path, start, stop) for start, stop in ranges]
+        for future in futures:
+            acronym_map.update(future.result())
+    return acronym_map
+
+def load_acronym_mapping(docs_dir=None, cache_file=None, workers=None):
+    """Load acronym mappings from the latest _STIG_Acronym_List_*.pdf in docs_dir.
+
+    The extracted mapping is cached as JSON keyed by the PDF's SHA-256, so the PDF is only
+    re-read when a new acronym list arrives. cache_file defaults to data/cache/acronym_map.json.
+    """
     acronym_map = {}
     if docs_dir is None:
         docs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "docs")
+    if cache_file is None:
+        cache_file = os.path.join(os.path.dirname(docs_dir), "cache", "acronym_map.json")
 
     acronym_files = glob.glob(os.path.join(docs_dir, "_STIG_Acronym_List_*.pdf"))
     if not acronym_files:
@@ -24,22 +66,39 @@ def load_acronym_mapping(docs_dir=None):
 
     # Use the latest file based on modification time
     latest_file = max(acronym_files, key=os.path.getmtime)
-    logging.info(f"Loading acronym mapping from {latest_file}")
+    pdf_hash = hash_file(latest_file)
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)
+            if cached.get("sha256") == pdf_hash:
+                logging.info(f"Loaded {len(cached['acronyms'])} acronyms for {latest_file} from {cache_file}")
+                return cached["acronyms"]
+        except (json.JSONDecodeError, KeyError, OSError) as e:
+            logging.warning(f"Ignoring unreadable acronym cache {cache_file}: {e}")
 
+    logging.info(f"Loading acronym mapping from {latest_file}")
     try:
-        with pdfplumber.open(latest_file) as pdf:
-            for page in pdf.pages:
-                # Extract tables from the page
-                tables = page.extract_tables()
-                for table in tables:
-                    for row in table:
-                        if len(row) >= 2 and row[0] and row[1]:  # Ensure row has acronym and meaning
-                            acronym = row[0].strip()
-                            meaning = row[1].strip().replace('\n', ' ')
-                            acronym_map[acronym] = meaning
+        acronym_map = extract_acronyms(latest_file, workers)
         logging.info(f"Loaded {len(acronym_map)} acronyms from {latest_file}")
     except Exception as e:
         logging.error(f"Failed to parse {latest_file}: {e}")
+        return acronym_map
+
+    temp_file = None
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # A unique temp file per writer: several processes may rebuild the cache at once
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(cache_file), suffix=".tmp", delete=False) as f:
+            temp_file = f.name
+            json.dump({"sha256": pdf_hash, "source": os.path.basename(latest_file), "acronyms": acronym_map},
+                      f, separators=(",", ":"))
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        logging.warning(f"Failed to write acronym cache {cache_file}: {e}")
+        if temp_file is not None and os.path.exists(temp_file):
+            os.unlink(temp_file)
 
     return acronym_map
 
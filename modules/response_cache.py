@@ -0,0 +1,91 @@
+# response_cache.py
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+
+def normalize_prompt(prompt):
+    """Collapse whitespace and case so trivially different phrasings share a cache entry."""
+    return " ".join(prompt.split()).casefold()
+
+class ResponseCache:
+    """Persistent LLM response cache in SQLite with TTL expiry and size-bounded LRU eviction.
+
+    Entries are keyed by model, normalized prompt and a hash of the compliance context, and
+    the whole cache is cleared when it is opened against a different corpus version.
+    """
+
+    def __init__(self, path, corpus_version=None, max_entries=1000, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+        """)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'corpus_version'").fetchone()
+        if corpus_version is not None and (row is None or row[0] != corpus_version):
+            if row is not None:
+                logging.info("Compliance corpus changed; clearing the LLM response cache.")
+            with self._db:
+                self._db.execute("DELETE FROM responses")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('corpus_version', ?)", (corpus_version,))
+
+    @staticmethod
+    def key(model, prompt, context):
+        """Return the cache key for a model, user prompt and assembled context."""
+        context_hash = hashlib.sha256(context.encode()).hexdigest()
+        return hashlib.sha256(f"{model}\0{normalize_prompt(prompt)}\0{context_hash}".encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for key, or None if it is missing, expired or the cache is closed."""
+        now = time.time()
+        with self._lock:
+            if self._db is None:
+                self.misses += 1
+                return None
+            with self._db:
+                row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] <= self.ttl_seconds:
+                    self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                    self.hits += 1
+                    return row[0]
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+    def put(self, key, response):
+        """Store a response, evicting the least recently used entries beyond max_entries; a no-op once closed."""
+        now = time.time()
+        with self._lock:
+            if self._db is None:
+                return
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, response, now, now))
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
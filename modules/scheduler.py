@@ -1,8 +1,10 @@
 import schedule
+import sys
 import time
 import subprocess
 import os
 import logging
+import threading
 from datetime import datetime
 
 # Configure logging
@@ -12,11 +14,20 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def run_data_fetcher():
-    """Run the data_fetcher.py script and log the outcome."""
-    script_path = os.path.join("modules", "data_fetcher.py")
-    python_path = os.path.join("venv", "bin", "python") if os.name != "nt" else os.path.join("venv", "Scripts", "python.exe")
-    
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_data_fetcher(on_success=None):
+    """Run the data_fetcher.py script and log the outcome.
+
+    on_success, if given, is called after a successful run, e.g. to swap a refreshed
+    corpus into a running process (see corpus_snapshots.CorpusSnapshots).
+    """
+    script_path = os.path.join(BASE_PATH, "modules", "data_fetcher.py")
+    venv_dir = os.path.join(BASE_PATH, "venv")
+    python_path = os.path.join(venv_dir, "bin", "python") if os.name != "nt" else os.path.join(venv_dir, "Scripts", "python.exe")
+    if not os.path.exists(python_path):
+        python_path = sys.executable
+
     if not os.path.exists(script_path):
         logging.error(f"Script not found: {script_path}")
         return
@@ -27,23 +38,37 @@ def run_data_fetcher():
         logging.debug(f"Output: {result.stdout}")
         if result.stderr:
             logging.warning(f"Errors/Warnings: {result.stderr}")
+        if on_success is not None:
+            on_success()
     except subprocess.CalledProcessError as e:
         logging.error(f"Data fetcher failed with exit code {e.returncode}: {e.stderr}")
     except Exception as e:
         logging.error(f"Unexpected error running data fetcher: {str(e)}")
 
-def schedule_updates():
+def schedule_updates(on_success=None, scheduler=schedule.default_scheduler):
     """Schedule periodic updates."""
-    # schedule.every().day.at("02:00").do(run_data_fetcher). # Every day at 2am
-    # schedule.every().hour.do(run_data_fetcher)  # Hourly
-    schedule.every().monday.at("09:00").do(run_data_fetcher)  # Weekly on Monday
-    # schedule.every(2).days.at("03:00").do(run_data_fetcher)  # Every 2 days
+    # scheduler.every().day.at("02:00").do(run_data_fetcher, on_success). # Every day at 2am
+    # scheduler.every().hour.do(run_data_fetcher, on_success)  # Hourly
+    scheduler.every().monday.at("09:00").do(run_data_fetcher, on_success)  # Weekly on Monday
+    # scheduler.every(2).days.at("03:00").do(run_data_fetcher, on_success)  # Every 2 days
 
     logging.info("Scheduler started. Waiting for scheduled tasks...")
     while True:
-        schedule.run_pending()
+        scheduler.run_pending()
         time.sleep(60)  # Check every minute
 
+def start_scheduler_thread(on_success=None):
+    """Run the update schedule on a daemon thread inside the calling process.
+
+    A long-running query process passes on_success=snapshots.refresh_in_background so that
+    each successful fetch swaps the new data in without a restart.
+    """
+    thread = threading.Thread(
+        target=schedule_updates, args=(on_success, schedule.Scheduler()), name="data-scheduler", daemon=True
+    )
+    thread.start()
+    return thread
+
 if __name__ == "__main__":
     try:
         schedule_updates()
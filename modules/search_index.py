@@ -0,0 +1,111 @@
+# search_index.py
+import os
+import re
+import math
+import logging
+import pickle
+import numpy as np
+from compliance_corpus import Rule
+from parse_cache import save_pickle
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+MARKUP_RE = re.compile(r"<[^>]+>")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have if in into is it its must not of on or shall
+that the their then there these this to was were which will with
+""".split())
+TITLE_WEIGHT = 2  # A term in a rule title counts as this many occurrences
+
+def tokenize(text):
+    """Lowercase text, drop embedded XCCDF markup and stopwords, and split it into alphanumeric tokens."""
+    return [token for token in TOKEN_RE.findall(MARKUP_RE.sub(" ", text or "").lower()) if token not in STOPWORDS]
+
+class SearchIndex:
+    """BM25-ranked inverted index over rule titles/descriptions and CCI definitions.
+
+    Postings are stored CSR-style: terms maps each token to a (start, stop) slice of two flat
+    arrays holding document numbers and their precomputed BM25 term weight. A query adds the
+    weights of its terms into a score vector and selects the top k with argpartition.
+    """
+
+    def __init__(self, version, doc_ids, terms, docs, weights):
+        self.version = version
+        self.doc_ids = doc_ids
+        self.terms = terms
+        self.docs = docs
+        self.weights = weights
+
+    @classmethod
+    def build(cls, corpus, k1=1.2, b=0.75):
+        """Build an index over every rule and CCI in a ComplianceCorpus."""
+        doc_ids = []
+        doc_lengths = []
+        term_docs = {}
+        for item in corpus.items.values():
+            counts = {}
+            if isinstance(item, Rule):
+                for token in tokenize(item.title):
+                    counts[token] = counts.get(token, 0) + TITLE_WEIGHT
+                for token in tokenize(item.description):
+                    counts[token] = counts.get(token, 0) + 1
+            else:
+                for token in tokenize(item.definition):
+                    counts[token] = counts.get(token, 0) + 1
+            doc = len(doc_ids)
+            doc_ids.append(item.id)
+            doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                term_docs.setdefault(token, []).append((doc, tf))
+
+        doc_count = len(doc_ids)
+        doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) if doc_count else 1.0
+        terms = {}
+        docs = []
+        tfs = []
+        idfs = []
+        for token, entries in term_docs.items():
+            terms[token] = (len(docs), len(docs) + len(entries))
+            docs.extend(doc for doc, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+            idf = math.log(1 + (doc_count - len(entries) + 0.5) / (len(entries) + 0.5))
+            idfs.extend([idf] * len(entries))
+        docs = np.asarray(docs, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+        idf = np.asarray(idfs, dtype=np.float32)
+        norm = k1 * (1 - b + b * doc_lengths[docs] / avg_length)
+        weights = (idf * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+        logging.info(f"Built search index with {len(terms)} terms over {doc_count} items")
+        return cls(corpus.version, doc_ids, terms, docs, weights)
+
+    def search(self, query, k=10):
+        """Return (total_matches, [(item_id, score), ...]) for the k highest-scoring items."""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for token in dict.fromkeys(tokenize(query)):
+            span = self.terms.get(token)
+            if span is not None:
+                start, stop = span
+                scores[self.docs[start:stop]] += self.weights[start:stop]
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+        top = matched[np.argsort(-scores[matched], kind="stable")]
+        total = int(np.count_nonzero(scores))
+        return total, [(self.doc_ids[doc], float(scores[doc])) for doc in top]
+
+def load_search_index(corpus, index_file):
+    """Return the cached search index for this corpus version, rebuilding and saving it if stale or missing."""
+    if os.path.exists(index_file):
+        try:
+            with open(index_file, 'rb') as f:
+                index = pickle.load(f)
+            if index.version == corpus.version:
+                logging.info(f"Loaded search index from {index_file}")
+                return index
+            logging.info("Search index is out of date with the corpus; rebuilding.")
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logging.warning(f"Failed to read search index {index_file}: {e}. Rebuilding.")
+
+    index = SearchIndex.build(corpus)
+    save_pickle(index_file, index)
+    return index
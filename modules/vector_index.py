@@ -0,0 +1,187 @@
+# vector_index.py
+import os
+import math
+import zlib
+import logging
+import pickle
+import numpy as np
+from compliance_corpus import Rule
+from search_index import tokenize
+from parse_cache import save_pickle
+
+class HashingEmbedder:
+    """Dependency-free embedder: hashes words, word bigrams and character trigrams into signed buckets.
+
+    Works on air-gapped hosts with nothing but NumPy. Quality is lexical rather than truly
+    semantic, but character trigrams still match misspellings and other word forms
+    ('encrypting' vs 'encryption') that share no whole token with the query.
+    """
+
+    def __init__(self, dimensions=512):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+        self._buckets = {}
+
+    def _bucket(self, feature):
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            digest = zlib.crc32(feature.encode())
+            bucket = (digest % self.dimensions, 1.0 if digest & 0x80000000 else -1.0)
+            self._buckets[feature] = bucket
+        return bucket
+
+    def embed(self, texts):
+        """Return an (len(texts), dimensions) float32 matrix of L2-normalized vectors."""
+        rows = []
+        columns = []
+        values = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            counts = {}
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                counts[feature] = counts.get(feature, 0) + 1
+            for token in tokens:
+                padded = f"<{token}>"
+                for start in range(len(padded) - 2):
+                    feature = padded[start:start + 3]
+                    counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                index, sign = self._bucket(feature)
+                rows.append(row)
+                columns.append(index)
+                values.append(sign * (1.0 + math.log(count)))
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(vectors, (rows, columns), values)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+class SentenceTransformerEmbedder:
+    """Embedder backed by a locally installed sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("sentence-transformers is not installed; use the 'hashing' embedder instead") from e
+        self.model = SentenceTransformer(model_name)
+        self.name = f"sentence-transformers-{model_name}"
+
+    def embed(self, texts):
+        """Return an (len(texts), dimensions) float32 matrix of L2-normalized vectors."""
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+def get_embedder(config):
+    """Create the embedder named by config["vector_embedder"].
+
+    'hashing' (the default) needs no extra packages; 'sentence-transformers:<model>' loads a
+    local sentence-transformers model. Falls back to hashing if the optional package is missing.
+    """
+    spec = config.get("vector_embedder", "hashing")
+    if spec.startswith("sentence-transformers:"):
+        try:
+            return SentenceTransformerEmbedder(spec.split(":", 1)[1])
+        except ImportError as e:
+            logging.warning(f"{e}. Falling back to the hashing embedder.")
+    return HashingEmbedder(config.get("vector_dimensions", 512))
+
+def item_text(item):
+    """Text embedded for a rule (title and description) or a CCI (definition)."""
+    if isinstance(item, Rule):
+        return f"{item.title}\n{item.description}"
+    return item.definition
+
+class VectorIndex:
+    """Matrix of normalized item embeddings answering top-k cosine queries with batched matrix products.
+
+    In quantized mode each row is stored as int8 codes plus a float32 scale, cutting memory 4x
+    at a small cost in score precision.
+    """
+
+    def __init__(self, version, embedder_name, doc_ids, matrix, scales=None):
+        self.version = version
+        self.embedder_name = embedder_name
+        self.doc_ids = doc_ids
+        self.matrix = matrix
+        self.scales = scales
+        self.embedder = None  # Attached at load time; never pickled with the index
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["embedder"] = None
+        return state
+
+    @property
+    def quantized(self):
+        return self.scales is not None
+
+    @classmethod
+    def build(cls, corpus, embedder, quantize=False, batch_size=1024):
+        """Embed every rule and CCI in a ComplianceCorpus."""
+        items = list(corpus.items.values())
+        doc_ids = [item.id for item in items]
+        chunks = []
+        scale_chunks = []
+        for start in range(0, len(items), batch_size):
+            vectors = embedder.embed([item_text(item) for item in items[start:start + batch_size]])
+            if quantize:
+                scale = (np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0).astype(np.float32)
+                vectors = np.round(vectors / scale[:, None]).astype(np.int8)
+                scale_chunks.append(scale)
+            chunks.append(vectors)
+        if chunks:
+            matrix = np.vstack(chunks)
+        else:
+            matrix = np.zeros((0, getattr(embedder, "dimensions", 0)), dtype=np.int8 if quantize else np.float32)
+        scales = None
+        if quantize:
+            scales = np.concatenate(scale_chunks) if scale_chunks else np.zeros(0, dtype=np.float32)
+        logging.info(f"Built {'int8' if quantize else 'float32'} vector index over {len(doc_ids)} items with {embedder.name}")
+        return cls(corpus.version, embedder.name, doc_ids, matrix, scales)
+
+    def search_batch(self, query_vectors, k=5, block_size=8192):
+        """Return the top-k (item_id, cosine) pairs for each row of an (m, d) matrix of normalized query vectors."""
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        scores = np.empty((len(query_vectors), len(self.doc_ids)), dtype=np.float32)
+        # Score the corpus in row blocks so int8 codes are only widened a block at a time
+        for start in range(0, len(self.doc_ids), block_size):
+            block = self.matrix[start:start + block_size].astype(np.float32, copy=False)
+            scores[:, start:start + block_size] = query_vectors @ block.T
+        if self.quantized:
+            scores *= self.scales
+        k = min(k, len(self.doc_ids))
+        results = []
+        for row in scores:
+            if k == 0:
+                results.append([])
+                continue
+            top = np.argpartition(row, -k)[-k:]
+            top = top[np.argsort(-row[top], kind="stable")]
+            results.append([(self.doc_ids[doc], float(row[doc])) for doc in top])
+        return results
+
+    def search(self, query_vector, k=5):
+        """Return the top-k (item_id, cosine) pairs for a single normalized query vector."""
+        return self.search_batch(np.asarray(query_vector, dtype=np.float32)[None, :], k)[0]
+
+    def search_text(self, text, k=5):
+        """Embed text with the attached embedder and return its top-k (item_id, cosine) pairs."""
+        return self.search(self.embedder.embed([text])[0], k)
+
+def load_vector_index(corpus, index_file, embedder, quantize=False):
+    """Return the cached vector index for this corpus version and embedder, rebuilding it if stale or missing."""
+    if os.path.exists(index_file):
+        try:
+            with open(index_file, 'rb') as f:
+                index = pickle.load(f)
+            if index.version == corpus.version and index.embedder_name == embedder.name and index.quantized == quantize:
+                logging.info(f"Loaded vector index from {index_file}")
+                index.embedder = embedder
+                return index
+            logging.info("Vector index is out of date with the corpus or embedder; rebuilding.")
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logging.warning(f"Failed to read vector index {index_file}: {e}. Rebuilding.")
+
+    index = VectorIndex.build(corpus, embedder, quantize)
+    save_pickle(index_file, index)
+    index.embedder = embedder
+    return index
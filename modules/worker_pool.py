@@ -0,0 +1,258 @@
+# worker_pool.py
+"""Pool of long-lived Python workers that run scripts on request.
+
+Front ends used to start a fresh interpreter for every request (`python3 script.py`).
+A worker instead stays up and runs scripts in-process, so imports stay warm. Each call's
+stdout, stderr and exit code are reported just as a subprocess would report them. Workers
+speak JSON-RPC 2.0 over stdin/stdout, one message per line, so the Node.js front end can
+share them:
+
+    -> {"jsonrpc": "2.0", "id": 1, "method": "run", "params": {"script": "script.py", "args": [], "cwd": null}}
+    <- {"jsonrpc": "2.0", "id": 1, "result": {"stdout": "...", "stderr": "", "exit_code": 0, "duration": 0.01}}
+
+Run this file directly to start a worker; import WorkerPool to manage a pool of them.
+"""
+import io
+import json
+import logging
+import os
+import queue
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+class WorkerError(Exception):
+    """Raised when a worker call cannot be completed."""
+
+class WorkerTimeout(WorkerError):
+    """Raised when a call outlives its timeout; the worker running it is killed."""
+
+def _run_script(script, args=(), cwd=None):
+    """Run a Python script as __main__ in this process, capturing its output like a subprocess.
+
+    Output is captured at the file-descriptor level, so child processes the script starts
+    (pip, venv) and logging handlers bound to stderr are captured too. stdin is /dev/null.
+    """
+    script = os.path.abspath(script)
+    cwd = os.path.abspath(cwd or os.path.dirname(script))
+    saved_argv, saved_path, saved_cwd = sys.argv, sys.path[:], os.getcwd()
+    saved_fds = os.dup(1), os.dup(2)
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        exit_code = 0
+        try:
+            sys.argv = [script] + [str(arg) for arg in args]
+            sys.path.insert(0, os.path.dirname(script))
+            os.chdir(cwd)
+            runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:
+            if e.code is None:
+                exit_code = 0
+            elif isinstance(e.code, int):
+                exit_code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            os.close(saved_fds[0])
+            os.close(saved_fds[1])
+            sys.argv, sys.path[:] = saved_argv, saved_path
+            os.chdir(saved_cwd)
+        out.seek(0)
+        err.seek(0)
+        return {
+            "stdout": out.read().decode(errors="replace"),
+            "stderr": err.read().decode(errors="replace"),
+            "exit_code": exit_code,
+            "duration": time.perf_counter() - start
+        }
+
+WORKER_METHODS = {
+    "ping": lambda: "pong",
+    "run": _run_script
+}
+
+def serve_worker(preload=()):
+    """Answer JSON-RPC requests from stdin until it closes."""
+    # Keep private handles on the protocol pipes, then point fds 0/1 elsewhere so nothing a
+    # script (or its children) reads or prints can interleave with the protocol
+    rpc_in = io.open(os.dup(0), "r", encoding="utf-8")
+    rpc_out = io.open(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+    sys.stdin = io.open(os.devnull, "r")
+    for module in preload:
+        __import__(module)
+
+    for line in rpc_in:
+        if not line.strip():
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            request = None
+            response = {"error": {"code": PARSE_ERROR, "message": str(e)}}
+        if request is not None and not isinstance(request, dict):
+            request = None
+            response = {"error": {"code": INVALID_REQUEST, "message": "Request must be a JSON object"}}
+        try:
+            if request is not None:
+                request_id = request.get("id")
+                method = WORKER_METHODS.get(request.get("method"))
+                if method is None:
+                    raise LookupError(f"Unknown method: {request.get('method')!r}")
+                params = request.get("params") or {}
+                response = {"result": method(**params) if isinstance(params, dict) else method(*params)}
+        except LookupError as e:
+            response = {"error": {"code": METHOD_NOT_FOUND, "message": str(e)}}
+        except TypeError as e:
+            response = {"error": {"code": INVALID_PARAMS, "message": str(e)}}
+        response.update(jsonrpc="2.0", id=request_id)
+        rpc_out.write(json.dumps(response) + "\n")
+        rpc_out.flush()
+
+class _Worker:
+    """One worker process and the thread that reads its replies."""
+
+    def __init__(self, preload):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), *preload],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8"
+        )
+        self.calls = 0
+        self.replies = queue.Queue()
+        threading.Thread(target=self._read_replies, daemon=True).start()
+
+    def _read_replies(self):
+        for line in self.process.stdout:
+            self.replies.put(line)
+        self.replies.put(None)  # EOF: the worker exited
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+    def close(self):
+        """Ask the worker to exit by closing its stdin, killing it if it does not."""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+class WorkerPool:
+    """A fixed-size pool of warm Python workers.
+
+    Calls wait in line for a free worker. A worker is replaced after max_calls calls (so
+    state a script leaves behind cannot accumulate), when a call exceeds its timeout, and
+    when it dies.
+    """
+
+    def __init__(self, size=2, max_calls=50, timeout=600, preload=()):
+        self.size = size
+        self.max_calls = max_calls
+        self.timeout = timeout
+        self.preload = tuple(preload)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(_Worker(self.preload))
+
+    def call(self, method, params=None, timeout=None, queue_timeout=None):
+        """Send one JSON-RPC call to a free worker and return its result.
+
+        Waits up to queue_timeout seconds for a worker (forever if None) and up to timeout
+        seconds (default: the pool's) for the reply. Raises WorkerTimeout or WorkerError.
+        """
+        if self._closed:
+            raise WorkerError("Worker pool is closed")
+        try:
+            worker = self._idle.get(timeout=queue_timeout)
+        except queue.Empty:
+            raise WorkerTimeout(f"No worker became free within {queue_timeout}s") from None
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+        timeout = self.timeout if timeout is None else timeout
+        healthy = False
+        try:
+            worker.calls += 1
+            try:
+                worker.process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}}) + "\n")
+                worker.process.stdin.flush()
+                line = worker.replies.get(timeout=timeout)
+            except OSError as e:
+                raise WorkerError(f"Worker process is gone: {e}") from None
+            except queue.Empty:
+                raise WorkerTimeout(f"{method} did not finish within {timeout}s; worker killed") from None
+            if line is None:
+                raise WorkerError(f"Worker exited with code {worker.process.wait()} during {method}")
+            reply = json.loads(line)
+            healthy = reply.get("id") == request_id
+            if not healthy:
+                raise WorkerError(f"Worker replied out of turn to {method}")
+            if "error" in reply:
+                raise WorkerError(reply["error"]["message"])
+            return reply["result"]
+        finally:
+            self._release(worker, healthy)
+
+    def run(self, script, args=(), cwd=None, timeout=None, queue_timeout=None):
+        """Run a script in a worker; returns {"stdout", "stderr", "exit_code", "duration"}."""
+        return self.call("run", {"script": os.path.abspath(script), "args": list(args), "cwd": cwd}, timeout, queue_timeout)
+
+    def _release(self, worker, healthy):
+        """Return a worker to the idle queue, or replace it if it failed or is due for recycling."""
+        if healthy and worker.calls < self.max_calls and not self._closed:
+            self._idle.put(worker)
+            return
+        if healthy:
+            worker.close()
+            logging.info(f"Recycled Python worker {worker.process.pid} after {worker.calls} calls")
+        else:
+            worker.kill()
+            logging.warning(f"Replaced failed Python worker {worker.process.pid}")
+        if self._closed:
+            return
+        try:
+            self._idle.put(_Worker(self.preload))
+        except OSError as e:
+            logging.error(f"Failed to start a replacement Python worker: {e}")
+
+    def close(self):
+        """Stop idle workers; busy ones stop when their call finishes."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+if __name__ == "__main__":
+    serve_worker(sys.argv[1:])
@@ -0,0 +1,164 @@
+# xccdf_parser.py
+import os
+import glob
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+from compliance_corpus import Rule, CCI, Reference
+from parse_cache import hash_file
+
+XCCDF_NAMESPACE_PREFIX = "http://checklists.nist.gov/xccdf/"
+CCI_NAMESPACE = "http://iase.disa.mil/cci"
+CCI_SYSTEM = "http://cyber.mil/cci"
+
+def _clear_element(elem):
+    """Free a finished element and any already-processed siblings that precede it."""
+    elem.clear()
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+def _benchmark_namespace(xml_file):
+    """Return the XCCDF namespace of a benchmark, or None if the root element is not an XCCDF Benchmark."""
+    for _, root in etree.iterparse(xml_file, events=("start",)):
+        qname = etree.QName(root)
+        if qname.localname == "Benchmark" and (qname.namespace or "").startswith(XCCDF_NAMESPACE_PREFIX):
+            return qname.namespace
+        logging.warning(f"{xml_file} is not an XCCDF benchmark (root element <{qname.localname}>); skipping")
+        return None
+    return None
+
+def iter_benchmark_rules(xml_file):
+    """Stream (rule_id, title, description, severity, ccis, srg) for each Group/Rule of an XCCDF benchmark.
+
+    srg is the Group's title, which in DISA benchmarks names the SRG requirement the
+    rule implements.
+
+    Uses iterparse and frees every Rule and Group once it is read, so peak memory
+    stays flat regardless of benchmark size. Any XCCDF namespace version is accepted;
+    files whose root is not an XCCDF Benchmark yield nothing.
+    """
+    namespace = _benchmark_namespace(xml_file)
+    if namespace is None:
+        return
+    rule_tag = f"{{{namespace}}}Rule"
+    group_tag = f"{{{namespace}}}Group"
+    title_tag = f"{{{namespace}}}title"
+    desc_tag = f"{{{namespace}}}description"
+    ident_tag = f"{{{namespace}}}ident"
+    for _, elem in etree.iterparse(xml_file, events=("end",), tag=(rule_tag, group_tag), remove_comments=True):
+        if elem.tag == rule_tag:
+            group = elem.getparent()
+            if group.tag == group_tag:
+                title_elem = elem.find(title_tag)
+                desc_elem = elem.find(desc_tag)
+                group_title = group.find(title_tag)
+                yield (
+                    elem.get("id"),
+                    title_elem.text if title_elem is not None else "No title",
+                    desc_elem.text if desc_elem is not None else "No description",
+                    elem.get("severity", "unknown"),
+                    [ident.text for ident in elem.iterchildren(ident_tag) if ident.get("system") == CCI_SYSTEM and ident.text],
+                    group_title.text.strip() if group_title is not None and group_title.text else None
+                )
+            elem.clear()
+        else:
+            _clear_element(elem)
+
+def parse_benchmark(xml_file, item_type):
+    """Parse the Group/Rule entries of an XCCDF benchmark into Rule records keyed by rule id."""
+    records = {}
+    file_name = os.path.basename(xml_file)
+    for control_id, title, description, severity, ccis, srg in iter_benchmark_rules(xml_file):
+        records[control_id] = Rule(control_id, item_type, title, description, severity, file_name, ccis, srg)
+    return records
+
+def parse_cci_list(xml_file):
+    """Parse the cci_item entries of a CCI list into CCI records keyed by CCI id.
+
+    Items are streamed with iterparse and freed as they are read. ATT&CK techniques
+    are not resolved here because they depend on the configured framework mapping;
+    load_compliance_data attaches them after loading.
+    """
+    records = {}
+    file_name = os.path.basename(xml_file)
+    ns = f"{{{CCI_NAMESPACE}}}"
+    for _, cci_item in etree.iterparse(xml_file, events=("end",), tag=f"{ns}cci_item", remove_comments=True):
+        cci_id = cci_item.get("id")
+        if not cci_id:
+            logging.warning(f"Skipping cci_item with no id in {xml_file}")
+            _clear_element(cci_item)
+            continue
+        definition_elem = cci_item.find(f"{ns}definition")
+        type_elem = cci_item.find(f"{ns}type")
+        status_elem = cci_item.find(f"{ns}status")
+        publishdate_elem = cci_item.find(f"{ns}publishdate")
+        contributor_elem = cci_item.find(f"{ns}contributor")
+        records[cci_id] = CCI(
+            cci_id,
+            definition_elem.text if definition_elem is not None else "No definition",
+            type_elem.text if type_elem is not None else "Unknown type",
+            status_elem.text if status_elem is not None else "Unknown status",
+            publishdate_elem.text if publishdate_elem is not None else "Unknown date",
+            contributor_elem.text if contributor_elem is not None else "Unknown contributor",
+            tuple(
+                Reference(
+                    ref.get("creator", "Unknown creator"),
+                    ref.get("title", "No title"),
+                    ref.get("version", "Unknown version"),
+                    ref.get("location", "No location"),
+                    ref.get("index", "No index")
+                )
+                for ref in cci_item.iterfind(f"{ns}references/{ns}reference")
+            ),
+            file_name
+        )
+        _clear_element(cci_item)
+    return records
+
+def list_source_files(config, base_path):
+    """Return (xml_file, item_type) for every STIG, then SRG, then CCI list file in the configured directories.
+
+    Files are sorted within each directory so that, when an id appears in more than one
+    file, the same record always wins: the one loaded last.
+    """
+    sources = [
+        (os.path.join(base_path, config["stig_dir"]), "STIG"),
+        (os.path.join(base_path, config["srg_dir"]), "SRG"),
+        (os.path.join(base_path, config["cci_list_dir"]), "CCI")
+    ]
+    return [
+        (xml_file, item_type)
+        for source_dir, item_type in sources
+        for xml_file in sorted(glob.glob(os.path.join(source_dir, "*.xml")))
+    ]
+
+def _parse_source_file(xml_file, item_type):
+    """Parse one STIG/SRG/CCI file and hash it; runs inside ingestion worker processes."""
+    try:
+        if item_type == "CCI":
+            records = parse_cci_list(xml_file)
+        else:
+            records = parse_benchmark(xml_file, item_type)
+        return records, hash_file(xml_file), None
+    except Exception as e:
+        return None, None, str(e)
+
+def parse_source_files(source_files, config):
+    """Parse (xml_file, item_type) pairs, across a process pool when more than one worker is configured.
+
+    Results are returned in input order. config["ingest_workers"] sets the pool size;
+    0 or missing means one worker per CPU core, 1 parses serially in this process.
+    """
+    workers = config.get("ingest_workers", 0) or os.cpu_count() or 1
+    workers = min(workers, len(source_files))
+    if workers <= 1:
+        return [_parse_source_file(xml_file, item_type) for xml_file, item_type in source_files]
+    logging.info(f"Parsing {len(source_files)} files across {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            _parse_source_file,
+            [xml_file for xml_file, _ in source_files],
+            [item_type for _, item_type in source_files]
+        ))
@@ -0,0 +1,256 @@
+# zip_extractor.py
+import io
+import os
+import re
+import json
+import hashlib
+import tempfile
+import logging
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+VERSION_RE = re.compile(r"[_-]V(\d+)R(\d+)", re.IGNORECASE)
+STATUS_DATE_RE = re.compile(rb'<(?:\w+:)?status\b[^>]*\bdate="([^"]+)"')
+
+def is_srg_zip(zip_name):
+    """Default routing rule: benchmarks whose enclosing zip is named like an SRG go to the SRG directory."""
+    return "_SRG" in zip_name.upper()
+
+def _open_inner_zip(parent, info):
+    """Open a zip stored inside another zip without writing it to disk.
+
+    The member is read from the parent's stream into memory once: reading a central
+    directory needs random access, and seeking backwards in a member stream re-reads it
+    from the start.
+    """
+    return zipfile.ZipFile(io.BytesIO(parent.read(info)))
+
+def _write_member(archive, info, dest_path):
+    """Stream one archive member to dest_path via a temporary file so readers never see a partial file.
+
+    Returns the SHA-256 of the contents, computed while writing.
+    """
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path), suffix=".tmp")
+    try:
+        with archive.open(info) as src, os.fdopen(fd, 'wb') as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                dst.write(chunk)
+                digest.update(chunk)
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return digest.hexdigest()
+
+def _walk_archive(archive, zip_name, stig_dir, srg_dir, docs_dir, is_srg, xml_suffix, written, members=None):
+    """Write the benchmarks and docs in an open archive, descending into nested zips in memory."""
+    for info in archive.infolist() if members is None else members:
+        if info.is_dir():
+            continue
+        file_name = os.path.basename(info.filename)
+        if file_name.lower().endswith(".zip"):
+            with _open_inner_zip(archive, info) as inner:
+                _walk_archive(inner, file_name, stig_dir, srg_dir, docs_dir, is_srg, xml_suffix, written)
+        elif file_name.endswith(xml_suffix):
+            dest_path = os.path.join(srg_dir if is_srg(zip_name) else stig_dir, file_name)
+            written.append((dest_path, _write_member(archive, info, dest_path)))
+            logging.info(f"Extracted {file_name} to {dest_path}")
+        elif docs_dir and file_name.endswith(".pdf") and file_name.startswith("_"):
+            dest_path = os.path.join(docs_dir, file_name)
+            written.append((dest_path, _write_member(archive, info, dest_path)))
+            logging.info(f"Extracted {file_name} to {dest_path}")
+
+def _extract_inner(outer, info, stig_dir, srg_dir, docs_dir, is_srg, xml_suffix):
+    """Worker task: process one top-level inner zip.
+
+    ZipFile serializes member reads on the shared outer handle with its own lock, so workers
+    only contend for the raw read; inflation and writing run in parallel.
+    """
+    written = []
+    with _open_inner_zip(outer, info) as inner:
+        _walk_archive(inner, os.path.basename(info.filename), stig_dir, srg_dir, docs_dir, is_srg, xml_suffix, written)
+    return written
+
+def extract_library(zip_path, stig_dir, srg_dir, docs_dir=None, is_srg=is_srg_zip, xml_suffix=".xml", workers=None):
+    """Extract XCCDF benchmarks (and underscore-prefixed PDFs, if docs_dir is given) from a nested library zip.
+
+    Inner zips are opened from the outer archive's member streams and only the wanted files
+    are written, straight to their final directories; nothing else touches the disk. Each
+    top-level inner zip is handled by a thread pool worker (inflation releases the GIL).
+    Returns the list of written paths in archive order.
+    """
+    written = []
+    with zipfile.ZipFile(zip_path) as outer, ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        members = [info for info in outer.infolist() if not info.is_dir()]
+        inner_zips = [info for info in members if info.filename.lower().endswith(".zip")]
+        # Loose files at the top level are cheap; write them here
+        loose = [info for info in members if not info.filename.lower().endswith(".zip")]
+        _walk_archive(outer, os.path.basename(zip_path), stig_dir, srg_dir, docs_dir, is_srg, xml_suffix, written, loose)
+        futures = [
+            executor.submit(_extract_inner, outer, info, stig_dir, srg_dir, docs_dir, is_srg, xml_suffix)
+            for info in inner_zips
+        ]
+        for future in futures:
+            written.extend(future.result())
+    logging.info(f"Extracted {len(written)} files from {len(inner_zips)} inner archives in {os.path.basename(zip_path)}")
+    return [path for path, _ in written]
+
+def benchmark_key(zip_name):
+    """Identify a benchmark across releases by its inner zip name without the V#R# release tag."""
+    return VERSION_RE.sub("", os.path.splitext(os.path.basename(zip_name))[0])
+
+def benchmark_version(zip_name):
+    """Return the V#R# release tag in an inner zip name, or an empty string."""
+    match = VERSION_RE.search(os.path.basename(zip_name))
+    return f"V{match.group(1)}R{match.group(2)}" if match else ""
+
+def _release(zip_name):
+    """Return (version, release) numbers of an inner zip name for ordering, (0, 0) if untagged."""
+    match = VERSION_RE.search(os.path.basename(zip_name))
+    return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+
+def inner_benchmarks(members):
+    """Return {benchmark_key: ZipInfo} for the inner zips among an outer zip's members.
+
+    When several inner zips share a key, releases of one benchmark in the same folder keep
+    only the newest, and same-named zips in different folders are keyed by their inner path
+    (without the release tag) instead. Either case is logged.
+    """
+    groups = {}
+    for info in members:
+        if info.filename.lower().endswith(".zip"):
+            groups.setdefault(benchmark_key(info.filename), []).append(info)
+    benchmarks = {}
+    for key, infos in groups.items():
+        if len(infos) == 1:
+            benchmarks[key] = infos[0]
+            continue
+        folders = {}
+        for info in infos:
+            folders.setdefault(os.path.dirname(info.filename), []).append(info)
+        for folder, releases in sorted(folders.items()):
+            newest = max(releases, key=lambda info: _release(info.filename))
+            for info in releases:
+                if info is not newest:
+                    logging.warning(f"Skipping {info.filename}: {newest.filename} is a newer release of {key}")
+            if len(folders) > 1:
+                folder_key = f"{folder}/{key}" if folder else key
+                logging.warning(f"Inner zip {newest.filename} shares the name {key} with another folder; recording it as {folder_key}")
+                benchmarks[folder_key] = newest
+            else:
+                benchmarks[key] = newest
+    return benchmarks
+
+def _benchmark_date(xml_path, head_size=65536):
+    """Return the XCCDF status date from the head of a benchmark file, if present."""
+    with open(xml_path, 'rb') as f:
+        match = STATUS_DATE_RE.search(f.read(head_size))
+    return match.group(1).decode() if match else None
+
+def load_manifest(manifest_file):
+    """Load the per-benchmark library manifest, or an empty one if it is missing or corrupt."""
+    if os.path.exists(manifest_file):
+        try:
+            with open(manifest_file, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Failed to read library manifest {manifest_file}: {e}. Starting empty.")
+    return {"library": None, "benchmarks": {}}
+
+def save_manifest(manifest_file, manifest):
+    """Write the library manifest atomically."""
+    directory = os.path.dirname(manifest_file) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, manifest_file)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def update_library(zip_path, stig_dir, srg_dir, manifest_file, docs_dir=None, is_srg=is_srg_zip, xml_suffix=".xml",
+                   workers=None, library_name=None):
+    """Bring the benchmark directories up to date with a new library zip, touching only what changed.
+
+    zip_path may also be a seekable file object (e.g. a remote file read with Range requests),
+    in which case library_name names it. Only the outer central directory is read up front. An inner zip is extracted when it is
+    new, its CRC or release tag differs from the manifest, or any of its files went missing;
+    files of removed benchmarks (and stale files of changed ones) are deleted. Untouched files
+    keep their mtimes, so the parse cache only re-parses the churn.
+    Returns a report dict with 'added', 'changed' and 'removed' benchmark keys and an 'unchanged' count.
+    """
+    manifest = load_manifest(manifest_file)
+    previous = manifest.get("benchmarks", {})
+    dirs = {"stig": stig_dir, "srg": srg_dir, "docs": docs_dir}
+    dir_kinds = {os.path.normpath(path): kind for kind, path in dirs.items() if path}
+
+    def entry_paths(entry):
+        return [os.path.join(dirs[f["dir"]], f["name"]) for f in entry["files"] if dirs.get(f["dir"])]
+
+    library_name = library_name or os.path.basename(zip_path)
+    written = []
+    with zipfile.ZipFile(zip_path) as outer:
+        members = [info for info in outer.infolist() if not info.is_dir()]
+        current = inner_benchmarks(members)
+        loose = [info for info in members if not info.filename.lower().endswith(".zip")]
+        _walk_archive(outer, library_name, stig_dir, srg_dir, docs_dir, is_srg, xml_suffix, written, loose)
+
+        report = {"added": [], "changed": [], "removed": sorted(set(previous) - set(current)), "unchanged": 0}
+        pending = []
+        for key, info in sorted(current.items()):
+            entry = previous.get(key)
+            if entry is None:
+                report["added"].append(key)
+            elif (entry["crc"] != info.CRC or entry["zip"] != os.path.basename(info.filename)
+                    or not all(os.path.exists(path) for path in entry_paths(entry))):
+                report["changed"].append(key)
+            else:
+                report["unchanged"] += 1
+                continue
+            pending.append((key, info))
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = {
+                key: executor.submit(_extract_inner, outer, info, stig_dir, srg_dir, docs_dir, is_srg, xml_suffix)
+                for key, info in pending
+            }
+            results = {key: future.result() for key, future in futures.items()}
+
+    benchmarks = {key: entry for key, entry in previous.items() if key in current}
+    stale = set()
+    for key in report["removed"]:
+        stale.update(entry_paths(previous[key]))
+    for key, info in pending:
+        files = []
+        for path, sha256 in results[key]:
+            files.append({
+                "name": os.path.basename(path),
+                "dir": dir_kinds[os.path.normpath(os.path.dirname(path))],
+                "sha256": sha256,
+                "date": _benchmark_date(path) if path.endswith(xml_suffix) else None
+            })
+        if key in previous:
+            stale.update(set(entry_paths(previous[key])) - {path for path, _ in results[key]})
+        benchmarks[key] = {
+            "zip": os.path.basename(info.filename),
+            "version": benchmark_version(info.filename),
+            "crc": info.CRC,
+            "files": files
+        }
+    # A stale file name may belong to another benchmark in this release; keep those
+    for entry in benchmarks.values():
+        stale.difference_update(entry_paths(entry))
+    for path in sorted(stale):
+        if os.path.exists(path):
+            os.remove(path)
+            logging.info(f"Removed stale benchmark file {path}")
+
+    save_manifest(manifest_file, {"library": library_name, "benchmarks": benchmarks})
+    logging.info(
+        f"Updated library from {library_name}: {len(report['added'])} added, "
+        f"{len(report['changed'])} changed, {len(report['removed'])} removed, {report['unchanged']} unchanged"
+    )
+    return report
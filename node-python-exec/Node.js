@@ -2,11 +2,12 @@
 
 /* Setup App */
 const express = require("express");
-const { exec } = require("child_process");
+const { PythonPool, poolOptions } = require("./python_pool");
 const path = require("path");
 
 const app = express();
 const PORT = 3000;
+const python = new PythonPool(poolOptions());
 
 
 // Serve static files (HTML, CSS, JS)
@@ -37,7 +38,7 @@ app.use(express.static(path.join(__dirname, "public")));
 
 /* fetch data functions */
 app.get("/data-fetcher", (req, res) => {
-    exec("python3 data_fetcher.py", (error, stdout, stderr) => {
+    python.exec("data_fetcher.py", (error, stdout, stderr) => {
         if (error) {
             console.error(`Error fetching data: ${error}`);
             res.status(500).send(`Error: ${error.message}`);
@@ -62,7 +63,7 @@ app.get("/data-fetcher", (req, res) => {
 
 /* start engine */
 app.get("/start-engine", (req, res) => {
-    exec("python3 setup_environment.py", (error, stdout, stderr) => {
+    python.exec("setup_environment.py", (error, stdout, stderr) => {
         if (error) {
             console.error(`Error starting environment: ${error}`);
             res.status(500).send(`Error: ${error.message}`);
@@ -0,0 +1,212 @@
+/* Filename: python_pool.js */
+
+/*
+ * Pool of long-lived Python workers (modules/worker_pool.py) that run our Python scripts
+ * without starting a new interpreter for every request. Workers speak JSON-RPC 2.0 over
+ * stdin/stdout, one message per line. Calls queue until a worker is free; a worker is
+ * replaced when a call times out, when it dies, and after maxCalls calls. A worker that
+ * never comes up is not replaced, and calls fail once no workers are left.
+ */
+const { spawn } = require("child_process");
+const fs = require("fs");
+const path = require("path");
+const readline = require("readline");
+
+const WORKER_SCRIPT = path.join(__dirname, "..", "modules", "worker_pool.py");
+// Id of the ping each worker is sent on startup; its reply shows the worker is up
+const READY_ID = "ready";
+const CONFIG_FILE = path.join(__dirname, "..", "config.json");
+
+/* Pool settings from config.json, falling back to defaults */
+function poolOptions() {
+    let config = {};
+    try {
+        config = JSON.parse(fs.readFileSync(CONFIG_FILE, "utf8"));
+    } catch (err) {
+        // No config.json yet (e.g. before setup): use the defaults
+    }
+    return {
+        size: config.worker_pool_size || 2,
+        maxCalls: config.worker_max_calls || 50,
+        timeoutMs: (config.worker_timeout_seconds || 600) * 1000
+    };
+}
+
+class PythonWorker {
+    constructor(python, preload, onExit) {
+        this.calls = 0;
+        this.current = null;
+        this.ready = false;
+        this.process = spawn(python, [WORKER_SCRIPT, ...preload], { stdio: ["pipe", "pipe", "inherit"] });
+        this.process.on("error", (err) => console.error(`Python worker error: ${err.message}`));
+        // EPIPE when the process is already gone; the exit handler deals with that
+        this.process.stdin.on("error", () => {});
+        readline.createInterface({ input: this.process.stdout }).on("line", (line) => this.onReply(line));
+        this.process.on("exit", (code) => {
+            if (this.current) {
+                clearTimeout(this.current.timer);
+                this.current.reject(new Error(`Python worker exited with code ${code}`));
+                this.current = null;
+            }
+            onExit(this);
+        });
+        // Queued ahead of any call, so it is answered as soon as the preloads are imported
+        this.process.stdin.write(JSON.stringify({ jsonrpc: "2.0", id: READY_ID, method: "ping" }) + "\n");
+    }
+
+    onReply(line) {
+        let reply;
+        try {
+            reply = JSON.parse(line);
+        } catch (err) {
+            reply = null;
+        }
+        if (reply && reply.id === READY_ID) {
+            this.ready = true;
+            return;
+        }
+        if (!this.current) {
+            return;
+        }
+        const call = this.current;
+        if (!reply) {
+            this.current = null;
+            clearTimeout(call.timer);
+            call.reject(new Error(`Unreadable reply from Python worker: ${line}`));
+            return;
+        }
+        if (reply.id !== call.id) {
+            return;
+        }
+        this.ready = true;
+        this.current = null;
+        clearTimeout(call.timer);
+        if (reply.error) {
+            call.reject(new Error(reply.error.message));
+        } else {
+            call.resolve(reply.result);
+        }
+    }
+
+    send(call) {
+        this.calls += 1;
+        this.current = call;
+        this.process.stdin.write(JSON.stringify({ jsonrpc: "2.0", id: call.id, method: call.method, params: call.params }) + "\n");
+    }
+}
+
+class PythonPool {
+    constructor({ size = 2, maxCalls = 50, timeoutMs = 600000, python = "python3", preload = ["requests"] } = {}) {
+        this.maxCalls = maxCalls;
+        this.timeoutMs = timeoutMs;
+        this.python = python;
+        this.preload = preload;
+        this.nextId = 0;
+        this.idle = [];
+        this.queue = [];
+        this.workers = new Set();
+        for (let i = 0; i < size; i++) {
+            this.spawnWorker();
+        }
+    }
+
+    spawnWorker() {
+        const worker = new PythonWorker(this.python, this.preload, (exited) => this.onWorkerExit(exited));
+        this.workers.add(worker);
+        this.idle.push(worker);
+        this.dispatch();
+    }
+
+    onWorkerExit(worker) {
+        if (!this.workers.delete(worker)) {
+            return;
+        }
+        this.idle = this.idle.filter((w) => w !== worker);
+        if (worker.ready) {
+            console.error(`Python worker ${worker.process.pid} exited; starting a replacement`);
+            this.spawnWorker();
+            return;
+        }
+        // A worker that never came up (bad interpreter path, import error) would just die again
+        console.error("Python worker failed to start; not replacing it");
+        if (this.workers.size === 0) {
+            this.failQueued(new Error("No Python workers are running"));
+        }
+    }
+
+    /* Reject every queued call */
+    failQueued(err) {
+        for (const call of this.queue.splice(0)) {
+            call.reject(err);
+        }
+    }
+
+    /* Replace a worker: after a timeout, or when it is due for recycling */
+    retire(worker) {
+        if (!this.workers.delete(worker)) {
+            return;
+        }
+        worker.process.stdin.end();
+        worker.process.kill();
+        this.spawnWorker();
+    }
+
+    dispatch() {
+        while (this.idle.length && this.queue.length) {
+            const worker = this.idle.shift();
+            const call = this.queue.shift();
+            call.timer = setTimeout(() => {
+                worker.current = null;
+                call.reject(new Error(`${call.method} did not finish within ${call.timeoutMs / 1000}s; worker killed`));
+                this.retire(worker);
+            }, call.timeoutMs);
+            const settle = () => {
+                if (!this.workers.has(worker)) {
+                    return;
+                }
+                if (worker.calls >= this.maxCalls) {
+                    this.retire(worker);
+                } else {
+                    this.idle.push(worker);
+                    this.dispatch();
+                }
+            };
+            call.promise.then(settle, settle);
+            worker.send(call);
+        }
+    }
+
+    /* Queue one JSON-RPC call; resolves with its result */
+    call(method, params = {}, timeoutMs = this.timeoutMs) {
+        const call = { id: ++this.nextId, method, params, timeoutMs };
+        call.promise = new Promise((resolve, reject) => {
+            call.resolve = resolve;
+            call.reject = reject;
+        });
+        if (this.workers.size === 0) {
+            call.reject(new Error("No Python workers are running"));
+            return call.promise;
+        }
+        this.queue.push(call);
+        this.dispatch();
+        return call.promise;
+    }
+
+    /* Run a Python script in a worker; resolves with { stdout, stderr, exit_code, duration } */
+    run(script, args = [], { cwd = null, timeoutMs } = {}) {
+        return this.call("run", { script: path.resolve(script), args, cwd }, timeoutMs);
+    }
+
+    /* Drop-in for child_process.exec("python3 <script>", callback), relative to this directory */
+    exec(script, callback) {
+        this.run(path.join(__dirname, script), [], { cwd: __dirname }).then(
+            (result) => {
+                const error = result.exit_code !== 0 ? new Error(`${script} exited with code ${result.exit_code}`) : null;
+                callback(error, result.stdout, result.stderr);
+            },
+            (err) => callback(err, "", "")
+        );
+    }
+}
+
+module.exports = { PythonPool, poolOptions };
@@ -1,9 +1,10 @@
 const express = require("express");
-const { exec } = require("child_process");
+const { PythonPool, poolOptions } = require("./python_pool");
 const path = require("path");
 
 const app = express();
 const PORT = 3000;
+const python = new PythonPool(poolOptions());
 
 
 
@@ -29,7 +30,7 @@ app.use(express.static(path.join(__dirname, "public")));
 
 /* Fetch Data */
 app.get("/data-fetcher", (req, res) => {
-    exec("python3 data_fetcher.py", (error, stdout, stderr) => {
+    python.exec("data_fetcher.py", (error, stdout, stderr) => {
         if (error) {
             console.error(`Error fetching data: ${error}`);
             res.status(500).send(`Error: ${error.message}`);
@@ -48,7 +49,7 @@ app.get("/data-fetcher", (req, res) => {
 
 /* Start Engine */
 app.get("/start-engine", (req, res) => {
-    exec("python3 setup_environment.py", (error, stdout, stderr) => {
+    python.exec("setup_environment.py", (error, stdout, stderr) => {
         if (error) {
             console.error(`Error starting environment: ${error}`);
             res.status(500).send(`Error: ${error.message}`);
@@ -0,0 +1,180 @@
+# check_data_fetcher.py
+"""Checks data_fetcher's conditional, resumable and range downloads against a local HTTP server.
+
+    python3 tests/check_data_fetcher.py
+
+The server stands in for the DISA and NIST hosts: it serves one file with an ETag and can
+cut a response short, ignore Range headers or answer with the wrong range. Everything runs
+in a temporary directory; the script exits non-zero if any check fails.
+"""
+import io
+import os
+import sys
+import hashlib
+import tempfile
+import threading
+import traceback
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "modules"))
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves server.body at any path, behaving as server.mode says."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body, etag, mode = server.body, server.etag, server.mode
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", {"ETag": etag})
+            return
+        byte_range = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if byte_range and mode != "ignore_range" and (if_range is None or if_range == etag):
+            start, _, end = byte_range[len("bytes="):].partition("-")
+            start = int(start)
+            end = min(int(end) if end else len(body) - 1, len(body) - 1)
+            if mode == "misaligned":
+                # A range, but not the one asked for
+                start //= 2
+            self._send(206, body[start:end + 1], {"ETag": etag, "Content-Range": f"bytes {start}-{end}/{len(body)}"})
+            return
+        if mode == "truncate":
+            # Promise the whole body, send half of it and drop the connection
+            self._send(200, body[:len(body) // 2], {"ETag": etag}, length=len(body))
+            self.close_connection = True
+            return
+        self._send(200, body, {"ETag": etag})
+
+    def _send(self, status, payload, headers, length=None):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload) if length is None else length))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+class StandInServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # Clients closing unread responses reset the connection; that is expected here
+
+def start_server(body, etag='"v1"'):
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    server.body, server.etag, server.mode, server.requests = body, etag, "normal", []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def check_downloads(data_fetcher, work_dir):
+    """Interrupted download then 206 resume, 304, ETag change, ignored Range, misaligned 206."""
+    body = os.urandom(200_000)
+    server, base = start_server(body)
+    url = f"{base}/library.zip"
+    destination = os.path.join(work_dir, "library.zip")
+    part = destination + ".part"
+    validators = data_fetcher.DownloadValidators(os.path.join(work_dir, "validators.json"))
+
+    server.mode = "truncate"
+    assert data_fetcher.download_file(url, destination, validators) is False, "truncated download should fail"
+    assert not os.path.exists(destination) and 0 < os.path.getsize(part) < len(body), "partial should be kept"
+    kept = os.path.getsize(part)
+
+    server.mode = "normal"
+    del server.requests[:]
+    assert data_fetcher.download_file(url, destination, validators) is True
+    assert server.requests[0].get("Range") == f"bytes={kept}-", "second attempt should resume"
+    assert read(destination) == body and not os.path.exists(part)
+    assert validators.get(url)["sha256"] == sha256(body)
+
+    assert data_fetcher.download_file(url, destination, validators) is None, "unchanged file should answer 304"
+
+    server.body, server.etag = os.urandom(150_000), '"v2"'
+    assert data_fetcher.download_file(url, destination, validators) is True, "new ETag should download again"
+    assert read(destination) == server.body and validators.get(url)["sha256"] == sha256(server.body)
+
+    for mode in ("ignore_range", "misaligned"):
+        # Large enough that the truncated attempt leaves a partial to resume
+        server.body, server.etag = os.urandom(300_000), f'"{mode}"'
+        server.mode = "truncate"
+        assert data_fetcher.download_file(url, destination, validators) is False
+        assert os.path.getsize(part) > 0
+        server.mode = mode
+        assert data_fetcher.download_file(url, destination, validators) is True, f"{mode}: download should succeed"
+        assert read(destination) == server.body, f"{mode}: destination must hold the whole file"
+        assert validators.get(url)["sha256"] == sha256(server.body), f"{mode}: recorded hash must match"
+    server.shutdown()
+
+def build_library(path):
+    """Write a small library zip: inner benchmark zips holding XCCDF files, plus a loose document."""
+    with zipfile.ZipFile(path, "w") as outer:
+        for name, is_srg in (("U_Example_OS", False), ("U_Example_App", False), ("U_Example_SRG", True)):
+            inner = io.BytesIO()
+            with zipfile.ZipFile(inner, "w") as z:
+                z.writestr(f"{name}_V1R1_Manual-xccdf.xml",
+                           f'<Benchmark><status date="2025-01-01">accepted</status>{name}{"x" * 5000}</Benchmark>')
+            outer.writestr(f"{name}_V1R1_{'SRG' if is_srg else 'STIG'}.zip", inner.getvalue())
+        outer.writestr("README.txt", "library")
+
+def snapshot(directory):
+    return {name: read(os.path.join(directory, name)) for name in sorted(os.listdir(directory))}
+
+def check_range_update(data_fetcher, work_dir):
+    """A range-read update matches a local one, and a server ignoring Range falls back."""
+    from zip_extractor import update_library
+    library = os.path.join(work_dir, "library_for_range.zip")
+    build_library(library)
+    results = {}
+    for how in ("local", "remote"):
+        stig_dir, srg_dir = os.path.join(work_dir, how, "stigs"), os.path.join(work_dir, how, "srgs")
+        os.makedirs(stig_dir)
+        os.makedirs(srg_dir)
+        manifest = os.path.join(work_dir, how, "manifest.json")
+        if how == "local":
+            report = update_library(library, stig_dir, srg_dir, manifest)
+        else:
+            server, base = start_server(read(library))
+            report = data_fetcher.update_library_remote(f"{base}/{os.path.basename(library)}", stig_dir, srg_dir, manifest)
+            assert all("Range" in request for request in server.requests), "every request should be a range read"
+            server.mode = "ignore_range"
+            fallback = data_fetcher.update_library_remote(f"{base}/{os.path.basename(library)}", stig_dir, srg_dir, manifest)
+            assert fallback is None, "a server ignoring Range should fall back to a full download"
+            server.shutdown()
+        results[how] = (report, snapshot(stig_dir), snapshot(srg_dir))
+    assert results["remote"] == results["local"], "range update should match the local update"
+    assert len(results["local"][0]["added"]) == 3
+
+CHECKS = (check_downloads, check_range_update)
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        # data_fetcher logs to data_fetcher.log in the working directory
+        os.chdir(work_dir)
+        import data_fetcher
+        for check in CHECKS:
+            try:
+                check(data_fetcher, tempfile.mkdtemp(dir=work_dir))
+                print(f"PASS {check.__name__}")
+            except Exception:
+                failures += 1
+                print(f"FAIL {check.__name__}")
+                traceback.print_exc()
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+class Job:
+    """A unit of background work and its progress, safe to read while a worker updates it.
+
+    Attributes:
+        id (str): Unique job id.
+        kind (str): What the job does (e.g. 'data_fetcher').
+        key (str): Jobs with the same key are not queued twice while one is still pending.
+        status (str): 'queued', 'running', 'succeeded' or 'failed'.
+        progress (dict): Counters the job reports while it runs.
+    """
+
+    def __init__(self, kind, func, key=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.func = func
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed")
+
+    def update(self, **progress):
+        """Set progress counters, e.g. job.update(stage='download', bytes_downloaded=1024)."""
+        with self._lock:
+            self.progress.update(progress)
+
+    def increment(self, name, amount=1):
+        """Add amount to a progress counter."""
+        with self._lock:
+            self.progress[name] = self.progress.get(name, 0) + amount
+
+    def to_dict(self):
+        """Return a JSON-serializable snapshot of the job."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished
+            }
+
+class JobQueue:
+    """A bounded queue of background jobs served by a fixed set of worker threads.
+
+    Args:
+        workers (int): Number of worker threads. One serializes all jobs, which keeps jobs
+            that share working directories from overlapping.
+        max_pending (int): Maximum number of queued (not yet running) jobs.
+        history (int): Number of finished jobs kept for status queries.
+    """
+
+    def __init__(self, workers=1, max_pending=8, history=100):
+        self.history = history
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._jobs = {}
+        self._active = {}  # key -> job that is queued or running
+        self._lock = threading.Lock()
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def submit(self, kind, func, key=None):
+        """Queue func(job) to run in the background.
+
+        Args:
+            kind (str): What the job does.
+            func (callable): Called with the Job; its return value becomes job.result.
+            key (str): Deduplication key. If a job with this key is queued or running, that
+                job is returned instead of queuing another.
+
+        Returns:
+            tuple: (job, created), where created is False for a deduplicated submission.
+
+        Raises:
+            QueueFullError: If max_pending jobs are already waiting.
+        """
+        with self._lock:
+            if key is not None and key in self._active:
+                return self._active[key], False
+            job = Job(kind, func, key)
+            try:
+                self._pending.put_nowait(job)
+            except queue.Full:
+                raise QueueFullError(f"Job queue is full ({self._pending.maxsize} jobs waiting)") from None
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active[key] = job
+            self._prune()
+            return job, True
+
+    def get(self, job_id):
+        """Return the job with this id, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        """Return all known jobs, newest first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.id]
+
+    def _work(self):
+        while True:
+            job = self._pending.get()
+            with job._lock:
+                job.status = "running"
+                job.started = time.time()
+            try:
+                result, error, status = job.func(job), None, "succeeded"
+            except Exception as e:
+                traceback.print_exc()
+                result, error, status = None, str(e), "failed"
+            with self._lock:
+                with job._lock:
+                    job.result, job.error, job.status = result, error, status
+                    job.finished = time.time()
+                if job.key is not None and self._active.get(job.key) is job:
+                    del self._active[job.key]